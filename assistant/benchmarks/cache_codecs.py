@@ -0,0 +1,129 @@
+"""
+Сравнение кодеков кэша на реальных по форме данных Film и PersonFilm.
+
+Для каждого сочетания кодека и сжатия измеряются время кодирования, время
+декодирования с валидацией моделей и размер значения. Если указан --redis-url,
+дополнительно измеряется память, которую значение занимает в Redis (MEMORY USAGE).
+
+Запуск из каталога assistant:
+    PYTHONPATH=src python benchmarks/cache_codecs.py --redis-url redis://:secret@localhost:6379
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from models.models import Film, Genre, Person, PersonFilm
+from services.cache import validate
+from services.codecs import CODECS, COMPRESSORS, CacheSerializer
+
+
+def make_person() -> Person:
+    return Person(id=str(uuid.uuid4()), full_name="Christopher Edward Nolan")
+
+
+def make_film_page(size: int = 50) -> list[Film]:
+    """Страница фильмов с вложенными жанрами и персонами, как в /api/v1/films/."""
+    return [
+        Film(
+            id=str(uuid.uuid4()),
+            title=f"Interstellar {i}",
+            imdb_rating=8.6,
+            description="A team of explorers travel through a wormhole in space " * 4,
+            genre=[Genre(id=str(uuid.uuid4()), name=name) for name in ("Sci-Fi", "Drama")],
+            actors=[make_person() for _ in range(12)],
+            writers=[make_person() for _ in range(3)],
+            directors=[make_person()],
+        )
+        for i in range(size)
+    ]
+
+
+def make_person_page(size: int = 50) -> list[PersonFilm]:
+    """Страница персон с фильмографией, как в /api/v1/persons/search/."""
+    return [
+        PersonFilm.model_validate(
+            {
+                "id": str(uuid.uuid4()),
+                "full_name": "Leonardo DiCaprio",
+                "films": [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "title": f"Inception {j}",
+                        "imdb_rating": 8.8,
+                        "roles": ["actor"],
+                    }
+                    for j in range(30)
+                ],
+            }
+        )
+        for _ in range(size)
+    ]
+
+
+def bench(serializer: CacheSerializer, value: list, model, repeat: int) -> tuple[float, float, bytes]:
+    """Возвращает лучшее время кодирования и декодирования и закодированное значение."""
+    best_encode = best_decode = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = serializer.dumps(value)
+        best_encode = min(best_encode, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        validate(serializer.loads(data), model)
+        best_decode = min(best_decode, time.perf_counter() - start)
+    return best_encode, best_decode, data
+
+
+async def memory_usage(redis: Optional[Redis], data: bytes) -> Optional[int]:
+    """Возвращает объём памяти, занимаемый значением в Redis."""
+    if redis is None:
+        return None
+    key = f"benchmark:codec:{uuid.uuid4().hex}"
+    await redis.set(key, data)
+    try:
+        return await redis.memory_usage(key)
+    finally:
+        await redis.delete(key)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url) if args.redis_url else None
+    payloads = {
+        "Film x50": (make_film_page(), Film),
+        "PersonFilm x50": (make_person_page(), PersonFilm),
+        "Genre x10000": ([Genre(id=str(uuid.uuid4()), name=f"Drama {i}") for i in range(10_000)], Genre),
+    }
+
+    for payload_name, (value, model) in payloads.items():
+        print(f"\n{payload_name}")
+        print(f"{'кодек':<10}{'сжатие':<8}{'кодирование, мс':>17}{'декодирование, мс':>19}"
+              f"{'размер, Б':>11}{'Redis, Б':>11}")
+        for codec in CODECS:
+            for compression in ["none", *COMPRESSORS]:
+                try:
+                    serializer = CacheSerializer(codec, compression, compression_threshold=0)
+                except RuntimeError as e:
+                    print(f"{codec:<10}{compression:<8}  пропущено: {e}")
+                    continue
+                encode, decode, data = bench(serializer, value, model, args.repeat)
+                memory = await memory_usage(redis, data)
+                print(
+                    f"{codec:<10}{compression:<8}{encode * 1000:>17.2f}{decode * 1000:>19.2f}"
+                    f"{len(data):>11}{memory if memory is not None else '-':>11}"
+                )
+
+    if redis is not None:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+Сравнение извлечения фильмов: разбор строк STRING_AGG в Python и json-агрегаты PostgreSQL.
+
+Для обоих вариантов измеряется скорость (строк/с) запроса и преобразования
+в модели Film по всем фильмам базы порциями по --batch-size идентификаторов,
+а также число документов, в которых варианты расходятся.
+
+Запуск из каталога assistant с заполненным .env:
+    PYTHONPATH=src python benchmarks/etl_movie_transform.py --repeat 3
+"""
+import argparse
+import asyncio
+import time
+
+import asyncpg
+
+from core.config import settings
+from etl.handler_et import PostgresTransform, init_connection
+from models.models import Film, Genre, Person
+
+LEGACY_MOVIE_SQL = """
+SELECT fw.id::text as film_work_id, fw.title,
+       fw.description,
+       STRING_AGG(DISTINCT p.id::text, ', ')                     as person_ids,
+       STRING_AGG(DISTINCT p.full_name || ':' || pfw.role, ', ') as persons_with_roles,
+       STRING_AGG(DISTINCT g.id::text || ':' || g.name, ', ')    as genres,
+       fw.rating                                                 as imdb_rating,
+       fw.created                                                as creation_date
+FROM content.film_work fw
+         LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
+         LEFT JOIN content.person p ON p.id = pfw.person_id
+         LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
+         LEFT JOIN content.genre g ON g.id = gfw.genre_id
+WHERE fw.id = ANY ($1::uuid[])
+GROUP BY fw.id, fw.title, fw.description, fw.rating, fw.created;
+"""
+
+
+def legacy_film(movie) -> Film:
+    """Прежний разбор строки фильма с жанрами и персонами в STRING_AGG."""
+    genres = []
+    if movie["genres"]:
+        for item in movie["genres"].split(", "):
+            genre_id, genre_name = item.split(":")
+            genres.append(Genre(id=genre_id, name=genre_name))
+
+    roles = {"writer": [], "actor": [], "director": []}
+    if movie["person_ids"]:
+        persons_with_roles = [item.split(":") for item in movie["persons_with_roles"].split(", ")]
+        for person_id, (full_name, role) in zip(movie["person_ids"].split(", "), persons_with_roles):
+            if role in roles:
+                roles[role].append(Person(id=person_id, full_name=full_name))
+
+    return Film(
+        id=movie["film_work_id"],
+        title=movie["title"],
+        imdb_rating=movie["imdb_rating"],
+        description=movie["description"],
+        genre=genres,
+        actors=roles["actor"],
+        writers=roles["writer"],
+        directors=roles["director"],
+    )
+
+
+def json_film(movie) -> Film:
+    """Разбор строки фильма, собранной json-агрегатами PostgreSQL."""
+    return Film.model_validate(dict(movie))
+
+
+def normalize(film: Film) -> tuple:
+    """Представление фильма, не зависящее от порядка жанров и персон."""
+    return (
+        film.id,
+        film.title,
+        frozenset((g.id, g.name) for g in film.genre),
+        frozenset((p.id, p.full_name) for p in film.actors),
+        frozenset((p.id, p.full_name) for p in film.writers),
+        frozenset((p.id, p.full_name) for p in film.directors),
+    )
+
+
+async def bench(conn, sql: str, parse, id_batches: list[list[str]], repeat: int) -> tuple[float, list[Film]]:
+    """Возвращает лучшее время извлечения и преобразования всех фильмов и сами фильмы."""
+    best = float("inf")
+    films = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        films = [parse(row) for ids in id_batches for row in await conn.fetch(sql, ids)]
+        best = min(best, time.perf_counter() - start)
+    return best, films
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(settings.postgres_url)
+    await init_connection(conn)
+    try:
+        ids = [row["id"] for row in await conn.fetch("SELECT id::text AS id FROM content.film_work")]
+        id_batches = [ids[i:i + args.batch_size] for i in range(0, len(ids), args.batch_size)]
+        json_sql = await PostgresTransform.read_sql_file("movie.sql")
+
+        legacy_time, legacy_films = await bench(conn, LEGACY_MOVIE_SQL, legacy_film, id_batches, args.repeat)
+        json_time, json_films = await bench(conn, json_sql, json_film, id_batches, args.repeat)
+    finally:
+        await conn.close()
+
+    legacy = {film.id: normalize(film) for film in legacy_films}
+    mismatches = sum(legacy.get(film.id) != normalize(film) for film in json_films)
+    print(f"Фильмов: {len(json_films)}, расхождений между вариантами: {mismatches}")
+    print(f"STRING_AGG + разбор в Python: {len(legacy_films) / legacy_time:.0f} строк/с")
+    print(f"json_agg + кодеки asyncpg:    {len(json_films) / json_time:.0f} строк/с")
+    print(f"ускорение x{legacy_time / json_time:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
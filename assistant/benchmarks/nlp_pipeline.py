@@ -0,0 +1,78 @@
+"""
+Сравнение раздельного (intent_nlp + ner_nlp) и объединённого конвейера IntentNERModel.
+
+Запуск из каталога assistant с заполненным .env:
+    PYTHONPATH=src python benchmarks/nlp_pipeline.py --repeat 5
+"""
+import argparse
+import time
+
+import spacy
+from spacy.tokens import DocBin
+
+from core.config import BASE_DIR
+from services.assistant import IntentNERModel
+
+TEST_CORPUS_PATH = BASE_DIR + "/output/ner/test.spacy"
+
+
+def load_texts(path: str) -> list[str]:
+    """Читает тексты высказываний из корпуса spaCy."""
+    nlp = spacy.blank("ru")
+    return [doc.text for doc in DocBin().from_disk(path).get_docs(nlp.vocab)]
+
+
+def bench_batch(model: IntentNERModel, texts: list[str], repeat: int, batch_size: int) -> float:
+    """Возвращает лучшее время обработки корпуса пакетами через predict_batch."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            model.predict_batch(texts[i:i + batch_size])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_single(model: IntentNERModel, texts: list[str], repeat: int) -> float:
+    """Возвращает лучшее время обработки корпуса по одному высказыванию."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            model.predict_batch([text])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", default=TEST_CORPUS_PATH)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    texts = load_texts(args.corpus)
+    separate = IntentNERModel(combined=False)
+    combined = IntentNERModel(combined=True)
+
+    mismatches = sum(
+        a != b
+        for a, b in zip(separate.predict_batch(texts), combined.predict_batch(texts))
+    )
+    print(f"Высказываний: {len(texts)}, расхождений в результатах: {mismatches}")
+
+    for name, bench in (
+        ("по одному", lambda m: bench_single(m, texts, args.repeat)),
+        (f"пакетами по {args.batch_size}", lambda m: bench_batch(m, texts, args.repeat, args.batch_size)),
+    ):
+        separate_time = bench(separate)
+        combined_time = bench(combined)
+        print(
+            f"{name}: раздельно {separate_time * 1e6 / len(texts):.0f} мкс/высказывание, "
+            f"объединённо {combined_time * 1e6 / len(texts):.0f} мкс/высказывание, "
+            f"ускорение x{separate_time / combined_time:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
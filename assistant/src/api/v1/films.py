@@ -2,15 +2,15 @@ from http import HTTPStatus
 from typing import Literal, Optional
 
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 
 from dependencies.container import ServiceContainer
 from models.models import Film
-from services.film import FilmService
+from services.film import FilmService, build_popular_query
 
 from . import validators
-from .models import ShortFilm
-from .paginations import PaginationParams
+from .models import BatchRequest, ShortFilm
+from .paginations import NEXT_CURSOR_RESPONSE, PaginationParams
 
 router = APIRouter()
 
@@ -20,13 +20,14 @@ router = APIRouter()
     summary="Получить популярные фильмы или фильмы по жанру",
     description="Этот эндпоинт возвращает список популярных фильмов или фильмов, отфильтрованных по жанру.",
     responses={
-        HTTPStatus.OK.value: {"description": "Список фильмов успешно получен"},
+        HTTPStatus.OK.value: {"description": "Список фильмов успешно получен", **NEXT_CURSOR_RESPONSE},
         HTTPStatus.NOT_FOUND.value: {"description": "Фильмы не найдены"},
     },
     response_model=list[ShortFilm],
 )
 @inject
 async def get_popular_or_by_genre_films(
+        response: Response,
         film_service: FilmService = Depends(Provide[ServiceContainer.film_service]),
         genre: Optional[str] = Query(None, description="ID жанра для фильтрации фильмов"),
         sort: Optional[Literal["-imdb_rating", "imdb_rating"]] = Query(
@@ -35,22 +36,13 @@ async def get_popular_or_by_genre_films(
         ),
         pg: PaginationParams = Depends(PaginationParams),
 ) -> list[ShortFilm]:
-    query = {
-        "query": {
-            "nested": {
-                "path": "genre",
-                "query": {
-                    "bool": {"must": [{"term": {"genre.id": genre}}] if genre else []}
-                },
-            }
-        },
-        "sort": [
-            {sort.lstrip("-"): {"order": "desc" if sort.startswith("-") else "asc"}}
-        ],
-        "from": pg.page_size * (pg.page_number - 1),
-        "size": pg.page_size,
-    }
-    list_film = await film_service.get_by_search(query)
+    list_film = None
+    if pg.cursor is None:
+        list_film = await film_service.get_popular(
+            genre, sort, offset=pg.page_size * (pg.page_number - 1), limit=pg.page_size
+        )
+    if list_film is None:
+        list_film = await pg.search(film_service, build_popular_query(genre, sort), response)
     validators.http_exception(list_film, HTTPStatus.NOT_FOUND, "Фильмы не найдены")
 
     return list_film
@@ -61,30 +53,53 @@ async def get_popular_or_by_genre_films(
     summary="Поиск фильмов",
     description="Этот эндпоинт позволяет искать фильмы по названию или описанию.",
     responses={
-        HTTPStatus.OK.value: {"description": "Фильмы найдены по запросу"},
+        HTTPStatus.OK.value: {"description": "Фильмы найдены по запросу", **NEXT_CURSOR_RESPONSE},
         HTTPStatus.NOT_FOUND.value: {"description": "Фильмы по запросу не найдены"},
     },
     response_model=list[ShortFilm],
 )
 @inject
 async def get_film_search(
+        response: Response,
         film_service: FilmService = Depends(Provide[ServiceContainer.film_service]),
         query: str = Query(..., description="Поисковый запрос для фильмов"),
         pg: PaginationParams = Depends(PaginationParams),
 ) -> list[ShortFilm]:
     search_query = {
         "query": {"multi_match": {"query": query, "fields": ["title", "description"]}},
-        "from": pg.page_size * (pg.page_number - 1),
-        "size": pg.page_size,
     }
 
-    film = await film_service.get_by_search(search_query)
+    film = await pg.search(film_service, search_query, response)
     validators.http_exception(
         film, HTTPStatus.NOT_FOUND, "Фильмы по запросу не найдены."
     )
     return film
 
 
+@router.post(
+    "/batch",
+    summary="Получить несколько фильмов по ID",
+    description=(
+            "Этот эндпоинт возвращает информацию о нескольких фильмах по списку ID "
+            "в порядке запроса. Ненайденные фильмы пропускаются."
+    ),
+    responses={
+        HTTPStatus.OK.value: {"description": "Информация о фильмах найдена"},
+        HTTPStatus.NOT_FOUND.value: {"description": "Фильмы не найдены"},
+    },
+    response_model=list[Film],
+)
+@inject
+async def get_film_batch(
+        request: BatchRequest,
+        film_service: FilmService = Depends(Provide[ServiceContainer.film_service]),
+) -> list[Film]:
+    films = await film_service.get_many(request.ids)
+    validators.http_exception(films, HTTPStatus.NOT_FOUND, "Фильмы не найдены.")
+
+    return films
+
+
 @router.get(
     "/{film_id}/",
     summary="Получить детали фильма",
@@ -5,7 +5,7 @@ from fastapi import APIRouter, Depends
 
 from dependencies.container import ServiceContainer
 from models.models import Genre
-from services.genre import GenreService
+from services.genre import GENRE_LIST_QUERY, GenreService
 
 from . import validators
 
@@ -22,8 +22,7 @@ router = APIRouter()
 async def get_genre_list(
         genre_service: GenreService = Depends(Provide[ServiceContainer.genre_service]),
 ):
-    query = {"size": 10_000}
-    genre_list = await genre_service.get_by_search(query)
+    genre_list = await genre_service.get_by_search(GENRE_LIST_QUERY)
     validators.http_exception(genre_list, HTTPStatus.NOT_FOUND, "Жанры не найдены.")
 
     return genre_list
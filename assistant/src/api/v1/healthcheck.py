@@ -1,8 +1,87 @@
-from fastapi import APIRouter
+from typing import Any
+
+from dependency_injector.wiring import Provide, inject
+from elasticsearch import AsyncElasticsearch
+from fastapi import APIRouter, Depends, Response, status
+from redis.asyncio import Redis
+
+from core.clients import get_elastic_pool_stats, get_redis_pool_stats
+from core.config import Settings
+from dependencies.container import ServiceContainer
+from etl.scheduler import get_etl_status
+from etl.state import State
+from services.cache import TieredCacheRepository
+from services.warmup import WarmUp
 
 router = APIRouter()
 
 
-@router.get("/")
+@router.get(
+    "/",
+    summary="Проверка живости",
+    description="Отвечает, пока процесс работает, в том числе во время прогрева.",
+)
 async def healthcheck():
     return {"status": "ok"}
+
+
+@router.get(
+    "/ready",
+    summary="Проверка готовности",
+    description=(
+            "Возвращает код 503, пока не завершился прогрев кэша после запуска, и итоги прогрева "
+            "после его завершения. NLP-модели загружаются в фоне и готовность не задерживают: "
+            "их состояние показывают поля nlp_ready и nlp_error."
+    ),
+)
+@inject
+async def readiness(
+        response: Response,
+        warm_up: WarmUp = Depends(Provide[ServiceContainer.warm_up]),
+) -> dict[str, Any]:
+    nlp = {"nlp_ready": warm_up.nlp_ready, "nlp_error": warm_up.nlp_error}
+    if not warm_up.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "warming_up", **nlp}
+    return {"status": "ready", **nlp, "warm_up": warm_up.stats}
+
+
+@router.get(
+    "/metrics",
+    summary="Метрики пулов соединений и кэша",
+    description=(
+            "Возвращает занятость пулов соединений Redis и Elasticsearch, время ожидания "
+            "соединения из пула Redis и счётчики попаданий кэша текущего процесса."
+    ),
+)
+@inject
+async def metrics(
+        redis_client: Redis = Depends(Provide[ServiceContainer.redis_client]),
+        elastic_client: AsyncElasticsearch = Depends(Provide[ServiceContainer.elastic_client]),
+        cache: TieredCacheRepository = Depends(Provide[ServiceContainer.cache]),
+) -> dict[str, Any]:
+    return {
+        "redis_pool": get_redis_pool_stats(redis_client),
+        "elastic_pool": get_elastic_pool_stats(elastic_client),
+        "cache": cache.get_stats(),
+    }
+
+
+@router.get(
+    "/etl",
+    summary="Статус загрузчика ETL",
+    description=(
+            "Возвращает итоги последних запусков ETL, отметки изменений и отставание "
+            "индексов от PostgreSQL. Если отставание больше ETL_MAX_LAG_SECONDS, код ответа 503."
+    ),
+)
+@inject
+async def etl_status(
+        response: Response,
+        state: State = Depends(Provide[ServiceContainer.etl_state]),
+        settings: Settings = Depends(Provide[ServiceContainer.config]),
+) -> dict[str, Any]:
+    etl = await get_etl_status(state, settings.etl_max_lag_seconds)
+    if not etl["healthy"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return etl
@@ -4,6 +4,8 @@ from pydantic import BaseModel, Field, confloat
 
 from models.models import Person
 
+BATCH_SIZE_MAX: int = 100
+
 
 class UUIDMixin(BaseModel):
     """Миксин для добавления UUID в качестве поля `id` с генерацией уникального идентификатора по умолчанию."""
@@ -27,6 +29,22 @@ class ShortFilm(UUIDMixin):
         }
 
 
+class BatchRequest(BaseModel):
+    """Модель запроса на получение нескольких объектов по идентификаторам."""
+
+    ids: list[str] = Field(..., min_length=1, max_length=BATCH_SIZE_MAX)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": [
+                    "123e4567-e89b-12d3-a456-426614174003",
+                    "123e4567-e89b-12d3-a456-426614174006",
+                ]
+            }
+        }
+
+
 class FilmRole(UUIDMixin):
     """Модель для информации о ролях в фильме."""
 
@@ -1,22 +1,134 @@
-from fastapi import Query
+import base64
+from copy import deepcopy
+from http import HTTPStatus
+from typing import Any, Optional
+
+import orjson
+from fastapi import HTTPException, Query, Response
+
+from services.storage import PointInTimeError
 
 PAGE_SIZE_DEFAULT: int = 50
 PAGE_SIZE_MIN: int = 1
+PAGE_SIZE_MAX: int = 100
 
 PAGE_NUMBER: int = 1
 
+MAX_RESULT_WINDOW: int = 10_000
+
+CURSOR_START: str = "*"
+NEXT_CURSOR_HEADER: str = "X-Next-Cursor"
+
+NEXT_CURSOR_RESPONSE = {
+    "headers": {
+        NEXT_CURSOR_HEADER: {
+            "description": "Курсор следующей страницы, если она есть.",
+            "schema": {"type": "string"},
+        }
+    }
+}
+
+
+def encode_cursor(pit_id: str, search_after: list[Any]) -> str:
+    """Кодирует point in time и значения сортировки в непрозрачный курсор."""
+    return base64.urlsafe_b64encode(orjson.dumps({"pit": pit_id, "after": search_after})).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, list[Any]]:
+    """Раскодирует курсор, выданный encode_cursor."""
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return data["pit"], data["after"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Некорректный курсор.")
+
 
 class PaginationParams:
+    """
+    Параметры пагинации: по номеру страницы или по курсору.
+
+    Номер страницы превращается в from/size, поэтому глубина такой пагинации
+    ограничена MAX_RESULT_WINDOW документами. Курсорная пагинация начинается
+    с cursor=*, а курсор следующей страницы возвращается в заголовке
+    X-Next-Cursor: страницы читаются через search_after в point in time,
+    поэтому стоимость страницы не зависит от её глубины.
+    """
+
     def __init__(
             self,
             page_size: int = Query(
                 PAGE_SIZE_DEFAULT,
                 ge=PAGE_SIZE_MIN,
+                le=PAGE_SIZE_MAX,
                 description="Количество результатов на странице.",
             ),
             page_number: int = Query(
                 PAGE_NUMBER, ge=PAGE_NUMBER, description="Номер страницы для пагинации."
             ),
+            cursor: Optional[str] = Query(
+                None,
+                description=(
+                    "Курсор страницы: * для первой страницы, далее значение заголовка "
+                    "X-Next-Cursor предыдущего ответа. Номер страницы при этом не учитывается."
+                ),
+            ),
     ):
         self.page_number = page_number
         self.page_size = page_size
+        self.cursor = cursor
+        self.pit_id: Optional[str] = None
+        self.search_after: Optional[list[Any]] = None
+
+        if cursor is not None and cursor != CURSOR_START:
+            self.pit_id, self.search_after = decode_cursor(cursor)
+        elif cursor is None and page_size * page_number > MAX_RESULT_WINDOW:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f"Глубже {MAX_RESULT_WINDOW} результатов листайте с параметром cursor.",
+            )
+
+    def paginate(self, query: dict[str, Any]) -> dict[str, Any]:
+        """
+        Добавляет к запросу Elasticsearch параметры страницы.
+
+        В курсорном режиме сортировка дополняется полем id, чтобы порядок
+        документов с равными значениями сортировки был однозначным.
+        """
+        query = deepcopy(query)
+        query["size"] = self.page_size
+        if self.cursor is None:
+            query["from"] = self.page_size * (self.page_number - 1)
+            return query
+
+        sort = query.get("sort", [{"_score": {"order": "desc"}}])
+        if not any("id" in field for field in sort):
+            sort = [*sort, {"id": {"order": "asc"}}]
+        query["sort"] = sort
+        if self.search_after is not None:
+            query["search_after"] = self.search_after
+        return query
+
+    async def search(self, service, query: dict[str, Any], response: Response) -> list:
+        """
+        Выполняет поиск страницы через service.
+
+        В курсорном режиме курсор следующей страницы записывается в заголовок
+        ответа; у последней страницы его нет. На курсор с истёкшим point in time
+        отвечает 410, на курсор с некорректным — 400.
+        """
+        if self.cursor is None:
+            return await service.get_by_search(self.paginate(query))
+
+        try:
+            items, pit_id, search_after = await service.get_page(self.paginate(query), self.pit_id)
+        except PointInTimeError as e:
+            raise HTTPException(
+                status_code=HTTPStatus.GONE if e.expired else HTTPStatus.BAD_REQUEST,
+                detail=(
+                    f"Курсор {'устарел' if e.expired else 'недействителен'}, "
+                    f"начните заново с cursor={CURSOR_START}."
+                ),
+            )
+        if search_after is not None:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(pit_id, search_after)
+        return items
@@ -2,14 +2,14 @@ from http import HTTPStatus
 from typing import Optional
 
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 
 from dependencies.container import ServiceContainer
 from services.person import PersonService
 
 from . import validators
-from .models import PersonFilm, ShortFilm
-from .paginations import PaginationParams
+from .models import BatchRequest, PersonFilm, ShortFilm
+from .paginations import NEXT_CURSOR_RESPONSE, PaginationParams
 
 router = APIRouter()
 
@@ -18,10 +18,12 @@ router = APIRouter()
     "/search/",
     summary="Поиск по персонажам",
     description="Ищет персонажей по имени. Возвращает список персонажей с их фильмами.",
+    responses={HTTPStatus.OK.value: {"description": "Персонажи найдены", **NEXT_CURSOR_RESPONSE}},
     response_model=list[PersonFilm],
 )
 @inject
 async def get_person_search(
+        response: Response,
         person_service: PersonService = Depends(Provide[ServiceContainer.person_service]),
         query: Optional[str] = Query(..., description="Имя персонажа для поиска."),
         pg: PaginationParams = Depends(PaginationParams),
@@ -35,10 +37,8 @@ async def get_person_search(
                 ],
             }
         },
-        "from": pg.page_size * (pg.page_number - 1),
-        "size": pg.page_size,
     }
-    person_search = await person_service.get_by_search(search_query)
+    person_search = await pg.search(person_service, search_query, response)
     validators.http_exception(
         person_search, HTTPStatus.NOT_FOUND, "Персонажи не найдены."
     )
@@ -46,6 +46,26 @@ async def get_person_search(
     return person_search
 
 
+@router.post(
+    "/batch",
+    summary="Получение информации о нескольких персонажах",
+    description=(
+            "Возвращает информацию о персонажах по списку идентификаторов в порядке запроса. "
+            "Ненайденные персонажи пропускаются."
+    ),
+    response_model=list[PersonFilm],
+)
+@inject
+async def get_person_batch(
+        request: BatchRequest,
+        person_service: PersonService = Depends(Provide[ServiceContainer.person_service]),
+) -> list[PersonFilm]:
+    persons = await person_service.get_many(request.ids)
+    validators.http_exception(persons, HTTPStatus.NOT_FOUND, "Персонажи не найдены.")
+
+    return persons
+
+
 @router.get(
     "/{person_id}/",
     summary="Получение информации о персонаже",
@@ -0,0 +1,121 @@
+import time
+from typing import Any
+
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import BlockingConnectionPool, Redis, UnixDomainSocketConnection
+from redis.asyncio.retry import Retry
+from redis.backoff import EqualJitterBackoff
+
+from core.config import Settings
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """
+    Блокирующий пул соединений Redis с учётом занятости и времени ожидания.
+
+    При исчерпании max_connections запрос ждёт освобождения соединения не дольше
+    timeout секунд вместо немедленной ошибки.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.acquired = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def get_connection(self, command_name, *keys, **options):
+        """Выдаёт соединение из пула, замеряя время ожидания."""
+        start = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.acquired += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Возвращает занятость пула и статистику ожидания соединений."""
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "available": len(self._available_connections),
+            "acquired": self.acquired,
+            "wait_time_avg_ms": round(self.wait_time_total / self.acquired * 1000, 3)
+            if self.acquired
+            else 0.0,
+            "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+        }
+
+
+def create_redis_client(settings: Settings) -> Redis:
+    """Создаёт клиент Redis с настроенным пулом соединений, таймаутами и повторами."""
+    connection_kwargs = {
+        "password": settings.redis_password,
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_connect_timeout": settings.redis_socket_connect_timeout,
+        "health_check_interval": settings.redis_health_check_interval,
+        "retry": Retry(
+            EqualJitterBackoff(
+                cap=settings.redis_retry_backoff_cap,
+                base=settings.redis_retry_backoff_base,
+            ),
+            retries=settings.redis_retry_attempts,
+        ),
+        "retry_on_timeout": True,
+    }
+    if settings.redis_unix_socket_path:
+        connection_kwargs.update(
+            connection_class=UnixDomainSocketConnection,
+            path=settings.redis_unix_socket_path,
+        )
+    else:
+        connection_kwargs.update(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            socket_keepalive=settings.redis_socket_keepalive,
+        )
+
+    pool = InstrumentedConnectionPool(
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        **connection_kwargs,
+    )
+    return Redis.from_pool(pool)
+
+
+def create_elastic_client(settings: Settings) -> AsyncElasticsearch:
+    """Создаёт клиент Elasticsearch с настроенным пулом соединений, таймаутами и повторами."""
+    return AsyncElasticsearch(
+        hosts=settings.elastic_url,
+        maxsize=settings.elastic_maxsize,
+        timeout=settings.elastic_timeout,
+        max_retries=settings.elastic_max_retries,
+        retry_on_timeout=settings.elastic_retry_on_timeout,
+        http_compress=settings.elastic_http_compress,
+    )
+
+
+def get_redis_pool_stats(client: Redis) -> dict[str, Any]:
+    """Возвращает статистику пула соединений клиента Redis."""
+    pool = client.connection_pool
+    if isinstance(pool, InstrumentedConnectionPool):
+        return pool.get_stats()
+    return {"max_connections": pool.max_connections}
+
+
+def get_elastic_pool_stats(client: AsyncElasticsearch) -> list[dict[str, Any]]:
+    """Возвращает занятость пулов соединений aiohttp по каждому узлу Elasticsearch."""
+    stats = []
+    for connection in client.transport.connection_pool.connections:
+        session = getattr(connection, "session", None)
+        connector = session.connector if session is not None else None
+        stats.append(
+            {
+                "host": connection.host,
+                "max_connections": connector.limit if connector else None,
+                "in_use": len(connector._acquired) if connector else 0,
+                "waiting": len(connector._waiters) if connector else 0,
+            }
+        )
+    return stats
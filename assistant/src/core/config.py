@@ -1,5 +1,6 @@
 import os
 from logging import config as logging_config
+from typing import Literal, Optional
 
 from dotenv import find_dotenv
 from pydantic import Field
@@ -23,6 +24,74 @@ class Settings(BaseSettings):
     redis_password: str = Field(..., alias="REDIS_PASSWORD")
     redis_url: str = Field(..., alias="REDIS_URL")
     elastic_url: str = Field(..., alias="ELASTIC_URL")
+    redis_max_connections: int = Field(50, alias="REDIS_MAX_CONNECTIONS")
+    redis_pool_timeout: float = Field(5.0, alias="REDIS_POOL_TIMEOUT")
+    redis_socket_timeout: float = Field(2.0, alias="REDIS_SOCKET_TIMEOUT")
+    redis_socket_connect_timeout: float = Field(2.0, alias="REDIS_SOCKET_CONNECT_TIMEOUT")
+    redis_socket_keepalive: bool = Field(True, alias="REDIS_SOCKET_KEEPALIVE")
+    redis_health_check_interval: int = Field(30, alias="REDIS_HEALTH_CHECK_INTERVAL")
+    redis_retry_attempts: int = Field(3, alias="REDIS_RETRY_ATTEMPTS")
+    redis_retry_backoff_base: float = Field(0.05, alias="REDIS_RETRY_BACKOFF_BASE")
+    redis_retry_backoff_cap: float = Field(1.0, alias="REDIS_RETRY_BACKOFF_CAP")
+    redis_unix_socket_path: Optional[str] = Field(None, alias="REDIS_UNIX_SOCKET_PATH")
+    elastic_maxsize: int = Field(25, alias="ELASTIC_MAXSIZE")
+    elastic_timeout: float = Field(10.0, alias="ELASTIC_TIMEOUT")
+    elastic_max_retries: int = Field(3, alias="ELASTIC_MAX_RETRIES")
+    elastic_retry_on_timeout: bool = Field(True, alias="ELASTIC_RETRY_ON_TIMEOUT")
+    elastic_http_compress: bool = Field(False, alias="ELASTIC_HTTP_COMPRESS")
+    elastic_pit_keep_alive: str = Field("1m", alias="ELASTIC_PIT_KEEP_ALIVE")
+    cache_codec: Literal["json", "orjson", "msgpack"] = Field("orjson", alias="CACHE_CODEC")
+    cache_compression: Literal["none", "zstd", "lz4"] = Field("none", alias="CACHE_COMPRESSION")
+    cache_compression_threshold: int = Field(2048, alias="CACHE_COMPRESSION_THRESHOLD")
+    cache_local_size: int = Field(10_000, alias="CACHE_LOCAL_SIZE")
+    cache_soft_ttl: int = Field(60 * 3, alias="CACHE_SOFT_TTL")
+    cache_hard_ttl: int = Field(60 * 60, alias="CACHE_HARD_TTL")
+    cache_xfetch_beta: float = Field(1.0, alias="CACHE_XFETCH_BETA")
+    cache_single_flight_distributed: bool = Field(
+        False, alias="CACHE_SINGLE_FLIGHT_DISTRIBUTED"
+    )
+    cache_lock_lease_ms: int = Field(2000, alias="CACHE_LOCK_LEASE_MS")
+    cache_lock_poll_ms: int = Field(50, alias="CACHE_LOCK_POLL_MS")
+    film_listings_depth: int = Field(1000, alias="FILM_LISTINGS_DEPTH")
+    entity_dictionary_refresh_interval: float = Field(30, alias="ENTITY_DICTIONARY_REFRESH_INTERVAL")
+    query_log_period: int = Field(60 * 60, alias="QUERY_LOG_PERIOD")
+    query_log_flush_interval: float = Field(10, alias="QUERY_LOG_FLUSH_INTERVAL")
+    warmup_enabled: bool = Field(True, alias="WARMUP_ENABLED")
+    warmup_top_k: int = Field(200, alias="WARMUP_TOP_K")
+    warmup_timeout: float = Field(60, alias="WARMUP_TIMEOUT")
+    assistant_intent_threshold: float = Field(0.3, alias="ASSISTANT_INTENT_THRESHOLD")
+    assistant_max_entities: int = Field(3, alias="ASSISTANT_MAX_ENTITIES")
+    assistant_max_intents: int = Field(2, alias="ASSISTANT_MAX_INTENTS")
+    assistant_response_timeout: float = Field(2.5, alias="ASSISTANT_RESPONSE_TIMEOUT")
+    assistant_cache_ttl: int = Field(60 * 60, alias="ASSISTANT_CACHE_TTL")
+    assistant_cache_local_ttl: int = Field(60, alias="ASSISTANT_CACHE_LOCAL_TTL")
+    assistant_cache_local_size: int = Field(10_000, alias="ASSISTANT_CACHE_LOCAL_SIZE")
+    nlp_batch_size: int = Field(32, alias="NLP_BATCH_SIZE")
+    nlp_batch_wait_ms: float = Field(5.0, alias="NLP_BATCH_WAIT_MS")
+    nlp_combined_pipeline: bool = Field(True, alias="NLP_COMBINED_PIPELINE")
+    nlp_backend: Literal["thread", "process"] = Field("thread", alias="NLP_BACKEND")
+    nlp_workers: int = Field(default_factory=lambda: os.cpu_count() or 1, alias="NLP_WORKERS")
+    nlp_queue_size: int = Field(256, alias="NLP_QUEUE_SIZE")
+    nlp_queue_timeout_ms: float = Field(100.0, alias="NLP_QUEUE_TIMEOUT_MS")
+    etl_state_storage: Literal["redis", "file"] = Field("redis", alias="ETL_STATE_STORAGE")
+    etl_state_file_path: str = Field(
+        os.path.join(BASE_DIR, "etl_state.json"), alias="ETL_STATE_FILE_PATH"
+    )
+    etl_batch_size: int = Field(100, alias="ETL_BATCH_SIZE")
+    etl_queue_size: int = Field(4, alias="ETL_QUEUE_SIZE")
+    etl_bulk_chunk_size: int = Field(500, alias="ETL_BULK_CHUNK_SIZE")
+    etl_bulk_max_chunk_bytes: int = Field(10 * 1024 * 1024, alias="ETL_BULK_MAX_CHUNK_BYTES")
+    etl_bulk_workers: int = Field(4, alias="ETL_BULK_WORKERS")
+    etl_bulk_max_retries: int = Field(5, alias="ETL_BULK_MAX_RETRIES")
+    etl_bulk_initial_backoff: float = Field(1.0, alias="ETL_BULK_INITIAL_BACKOFF")
+    etl_bulk_max_backoff: float = Field(60.0, alias="ETL_BULK_MAX_BACKOFF")
+    etl_index_keep_versions: int = Field(2, alias="ETL_INDEX_KEEP_VERSIONS")
+    etl_change_feed: bool = Field(True, alias="ETL_CHANGE_FEED")
+    etl_change_feed_install_triggers: bool = Field(True, alias="ETL_CHANGE_FEED_INSTALL_TRIGGERS")
+    etl_change_feed_debounce_ms: int = Field(500, alias="ETL_CHANGE_FEED_DEBOUNCE_MS")
+    etl_interval_seconds: float = Field(60, alias="ETL_INTERVAL_SECONDS")
+    etl_lock_lease_ms: int = Field(60_000, alias="ETL_LOCK_LEASE_MS")
+    etl_max_lag_seconds: float = Field(60 * 5, alias="ETL_MAX_LAG_SECONDS")
 
 
 class AssistantSettings(BaseSettings):
@@ -1,50 +1,191 @@
+import functools
+
 from dependency_injector import containers, providers
-from elasticsearch import AsyncElasticsearch
-from redis.asyncio import Redis
 
+from core.clients import create_elastic_client, create_redis_client
 from core.config import Settings
 from dependencies.register import RepositoryFactory
+from etl.state import JsonFileStorage, RedisStorage, State
 from services.assistant import AssistantService, IntentNERModel
-from services.cache import RedisCacheRepository
+from services.cache import (RedisCacheRepository, TieredCacheRepository,
+                            UtteranceCache)
+from services.codecs import CacheSerializer
+from services.entities import EntityDictionary
 from services.film import FilmService
 from services.genre import GenreService
+from services.inference import (InferenceEngine, create_process_executor,
+                                predict_in_worker, prepare_for_fork)
+from services.listings import FilmListings
 from services.person import PersonService
+from services.query_log import QueryLog
+from services.services import CacheTTLPolicy
+from services.singleflight import SingleFlight
 from services.storage import ElasticStorageRepository
+from services.warmup import WarmUp
 
 
 class CoreContainer(containers.DeclarativeContainer):
     """Предоставляет основные ресурсы, такие как клиенты Redis и Elasticsearch, а также экземпляры репозиториев."""
 
     config = providers.Singleton(Settings)
-    redis_client = providers.Singleton(
-        Redis,
-        host=config.provided.redis_host,
-        port=config.provided.redis_port,
-        password=config.provided.redis_password,
+    redis_client = providers.Singleton(create_redis_client, settings=config)
+    elastic_client = providers.Singleton(create_elastic_client, settings=config)
+    cache_serializer = providers.Singleton(
+        CacheSerializer,
+        codec=config.provided.cache_codec,
+        compression=config.provided.cache_compression,
+        compression_threshold=config.provided.cache_compression_threshold,
+    )
+    redis_cache = providers.Singleton(
+        RedisCacheRepository, cache=redis_client, serializer=cache_serializer
+    )
+    cache = providers.Singleton(
+        TieredCacheRepository,
+        cache=redis_cache,
+        local_size=config.provided.cache_local_size,
+    )
+    storage = providers.Singleton(
+        ElasticStorageRepository,
+        storage=elastic_client,
+        pit_keep_alive=config.provided.elastic_pit_keep_alive,
+    )
+    single_flight = providers.Singleton(
+        SingleFlight,
+        cache=redis_cache,
+        distributed=config.provided.cache_single_flight_distributed,
+        lease_ms=config.provided.cache_lock_lease_ms,
+        poll_ms=config.provided.cache_lock_poll_ms,
     )
-    elastic_client = providers.Singleton(
-        AsyncElasticsearch, hosts=config.provided.elastic_url
+    cache_policy = providers.Singleton(
+        CacheTTLPolicy,
+        soft_ttl=config.provided.cache_soft_ttl,
+        hard_ttl=config.provided.cache_hard_ttl,
+        xfetch_beta=config.provided.cache_xfetch_beta,
+    )
+    query_log = providers.Singleton(
+        QueryLog,
+        redis=redis_client,
+        period=config.provided.query_log_period,
+        flush_interval=config.provided.query_log_flush_interval,
+    )
+    entity_dictionary = providers.Singleton(
+        EntityDictionary,
+        redis=redis_client,
+        refresh_interval=config.provided.entity_dictionary_refresh_interval,
+    )
+    film_listings = providers.Singleton(
+        FilmListings, redis=redis_client, depth=config.provided.film_listings_depth
+    )
+    etl_state = providers.Singleton(
+        State,
+        storage=providers.Selector(
+            config.provided.etl_state_storage,
+            redis=providers.Singleton(RedisStorage, redis=redis_client),
+            file=providers.Singleton(
+                JsonFileStorage, file_path=config.provided.etl_state_file_path
+            ),
+        ),
     )
-    cache = providers.Singleton(RedisCacheRepository, cache=redis_client)
-    storage = providers.Singleton(ElasticStorageRepository, storage=elastic_client)
 
 
 class ServiceContainer(containers.DeclarativeContainer):
     """Предоставляет сервисы приложения (FilmService, GenreService, PersonService) с необходимыми зависимостями."""
 
+    config = CoreContainer.config
+    redis_client = CoreContainer.redis_client
+    elastic_client = CoreContainer.elastic_client
+    cache = CoreContainer.cache
+    etl_state = CoreContainer.etl_state
+    query_log = CoreContainer.query_log
+    entity_dictionary = CoreContainer.entity_dictionary
+
     repository_factory = providers.Factory(
         RepositoryFactory,
         cache=CoreContainer.cache,
         storage=CoreContainer.storage,
+        single_flight=CoreContainer.single_flight,
+        cache_policy=CoreContainer.cache_policy,
+        query_log=CoreContainer.query_log,
     )
 
-    film_service = providers.Factory(FilmService, repository=repository_factory)
+    film_service = providers.Factory(
+        FilmService, repository=repository_factory, listings=CoreContainer.film_listings
+    )
     genre_service = providers.Factory(GenreService, repository=repository_factory)
     person_service = providers.Factory(PersonService, repository=repository_factory)
-    intent_ner_model = providers.Singleton(IntentNERModel)
+    intent_ner_model = providers.Singleton(
+        IntentNERModel, combined=CoreContainer.config.provided.nlp_combined_pipeline
+    )
+    inference_engine = providers.Selector(
+        CoreContainer.config.provided.nlp_backend,
+        thread=providers.Singleton(
+            InferenceEngine,
+            predict_batch=intent_ner_model.provided.predict_batch,
+            max_batch_size=CoreContainer.config.provided.nlp_batch_size,
+            max_wait_ms=CoreContainer.config.provided.nlp_batch_wait_ms,
+            max_queue_size=CoreContainer.config.provided.nlp_queue_size,
+            queue_timeout_ms=CoreContainer.config.provided.nlp_queue_timeout_ms,
+            prepare=intent_ner_model.provided.load,
+        ),
+        process=providers.Singleton(
+            InferenceEngine,
+            predict_batch=providers.Object(predict_in_worker),
+            max_batch_size=CoreContainer.config.provided.nlp_batch_size,
+            max_wait_ms=CoreContainer.config.provided.nlp_batch_wait_ms,
+            executor=providers.Singleton(
+                create_process_executor,
+                model=intent_ner_model,
+                workers=CoreContainer.config.provided.nlp_workers,
+                model_factory=providers.Factory(
+                    functools.partial,
+                    IntentNERModel,
+                    combined=CoreContainer.config.provided.nlp_combined_pipeline,
+                ),
+            ),
+            max_concurrency=CoreContainer.config.provided.nlp_workers,
+            max_queue_size=CoreContainer.config.provided.nlp_queue_size,
+            queue_timeout_ms=CoreContainer.config.provided.nlp_queue_timeout_ms,
+            prepare=providers.Callable(prepare_for_fork, model=intent_ner_model),
+        ),
+    )
+    utterance_cache = providers.Singleton(
+        UtteranceCache,
+        cache=CoreContainer.redis_cache,
+        ttl=CoreContainer.config.provided.assistant_cache_ttl,
+        local_ttl=CoreContainer.config.provided.assistant_cache_local_ttl,
+        local_size=CoreContainer.config.provided.assistant_cache_local_size,
+    )
     assistant_service = providers.Singleton(
         AssistantService,
         film_service=film_service,
         person_service=person_service,
-        intent_ner_model=intent_ner_model,
+        inference_engine=inference_engine,
+        utterance_cache=utterance_cache,
+        entity_dictionary=CoreContainer.entity_dictionary,
+        intent_threshold=CoreContainer.config.provided.assistant_intent_threshold,
+        max_entities=CoreContainer.config.provided.assistant_max_entities,
+        max_intents=CoreContainer.config.provided.assistant_max_intents,
+        response_timeout=CoreContainer.config.provided.assistant_response_timeout,
+    )
+    # Прогрев обращается к репозиториям без query_log, чтобы его запросы не
+    # считались пользовательским трафиком и не закрепляли себя в top_k.
+    warmup_repository_factory = providers.Factory(
+        RepositoryFactory,
+        cache=CoreContainer.cache,
+        storage=CoreContainer.storage,
+        single_flight=CoreContainer.single_flight,
+        cache_policy=CoreContainer.cache_policy,
+    )
+    warm_up = providers.Singleton(
+        WarmUp,
+        film_service=providers.Factory(
+            FilmService, repository=warmup_repository_factory, listings=CoreContainer.film_listings
+        ),
+        genre_service=providers.Factory(GenreService, repository=warmup_repository_factory),
+        person_service=providers.Factory(PersonService, repository=warmup_repository_factory),
+        inference_engine=inference_engine,
+        query_log=CoreContainer.query_log,
+        top_k=CoreContainer.config.provided.warmup_top_k,
+        timeout=CoreContainer.config.provided.warmup_timeout,
+        enabled=CoreContainer.config.provided.warmup_enabled,
     )
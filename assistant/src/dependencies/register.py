@@ -1,9 +1,11 @@
-from typing import Generic, Type, TypeVar
+from typing import Generic, Optional, Type, TypeVar
 
 from pydantic import BaseModel
 
 from services.cache import CacheInterface
-from services.services import BaseRepository
+from services.query_log import QueryLog
+from services.services import BaseRepository, CacheTTLPolicy
+from services.singleflight import SingleFlight
 from services.storage import StorageInterface
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
@@ -12,10 +14,27 @@ ModelType = TypeVar("ModelType", bound=BaseModel)
 class RepositoryFactory(Generic[ModelType]):
     """Класс для создания экземпляров репозиториев."""
 
-    def __init__(self, cache: CacheInterface, storage: StorageInterface):
+    def __init__(
+            self,
+            cache: CacheInterface,
+            storage: StorageInterface,
+            single_flight: Optional[SingleFlight] = None,
+            cache_policy: Optional[CacheTTLPolicy] = None,
+            query_log: Optional[QueryLog] = None,
+    ):
         self.cache = cache
         self.storage = storage
+        self.single_flight = single_flight
+        self.cache_policy = cache_policy
+        self.query_log = query_log
 
     def create(self, model: Type[ModelType]):
         """Создает репозиторий для указанной модели."""
-        return BaseRepository(cache=self.cache, storage=self.storage, model=model)
+        return BaseRepository(
+            cache=self.cache,
+            storage=self.storage,
+            model=model,
+            single_flight=self.single_flight,
+            cache_policy=self.cache_policy,
+            query_log=self.query_log,
+        )
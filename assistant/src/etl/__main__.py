@@ -0,0 +1,90 @@
+"""
+Загрузчик данных из PostgreSQL в Elasticsearch.
+
+Запуск:
+    python -m etl            периодический ETL каждые ETL_INTERVAL_SECONDS секунд
+                             и, если ETL_CHANGE_FEED, применение изменений через LISTEN/NOTIFY
+    python -m etl --once     один запуск
+    python -m etl --reindex  один запуск с построением всех индексов заново
+    python -m etl --status   статус и отставание; код возврата 1, если ETL отстаёт
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from dependencies.container import CoreContainer, ServiceContainer
+from etl.change_feed import ChangeFeed
+from etl.es_loader import ElasticsearchLoader
+from etl.handler_et import create_postgres_pool
+from etl.scheduler import ETLScheduler, get_etl_status
+
+
+async def run_with_change_feed(scheduler: ETLScheduler, core_container: CoreContainer, settings) -> None:
+    """Запускает периодический ETL вместе с потоком изменений из PostgreSQL."""
+    pool = await create_postgres_pool(min_size=1, max_size=4)
+    change_feed = ChangeFeed(
+        pool,
+        es=ElasticsearchLoader(core_container.elastic_client()),
+        cache=core_container.redis_cache(),
+        debounce_ms=settings.etl_change_feed_debounce_ms,
+        batch_size=settings.etl_batch_size,
+        install_triggers=settings.etl_change_feed_install_triggers,
+        listings=core_container.film_listings(),
+        entities=core_container.entity_dictionary(),
+        lock=scheduler.locked,
+    )
+    try:
+        await asyncio.gather(scheduler.run_forever(), change_feed.run())
+    finally:
+        await pool.close()
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--once", action="store_true", help="выполнить один запуск ETL")
+    parser.add_argument(
+        "--reindex", action="store_true", help="построить все индексы заново и выйти"
+    )
+    parser.add_argument("--status", action="store_true", help="вывести статус ETL")
+    args = parser.parse_args()
+
+    core_container = CoreContainer()
+    service_container = ServiceContainer()
+    settings = core_container.config()
+
+    try:
+        if args.status:
+            status = await get_etl_status(
+                core_container.etl_state(), settings.etl_max_lag_seconds
+            )
+            print(json.dumps(status, ensure_ascii=False, indent=2))
+            return 0 if status["healthy"] else 1
+
+        scheduler = ETLScheduler(
+            es_conn=core_container.elastic_client(),
+            redis=core_container.redis_client(),
+            state=core_container.etl_state(),
+            cache=core_container.redis_cache(),
+            listings=core_container.film_listings(),
+            entities=core_container.entity_dictionary(),
+            interval=settings.etl_interval_seconds,
+            lock_lease_ms=settings.etl_lock_lease_ms,
+            on_loaded=service_container.utterance_cache().invalidate,
+        )
+        if args.once or args.reindex:
+            await scheduler.run_once(reindex=args.reindex)
+        elif settings.etl_change_feed:
+            await run_with_change_feed(scheduler, core_container, settings)
+        else:
+            await scheduler.run_forever()
+        return 0
+    finally:
+        await core_container.redis_client().close()
+        await core_container.elastic_client().close()
+        await service_container.redis_client().close()
+        await service_container.elastic_client().close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+from typing import AsyncContextManager, AsyncIterator, Callable, Optional
+
+import asyncpg
+import orjson
+
+from etl.es_loader import ElasticsearchLoader
+from etl.entities import build_entity_dictionary
+from etl.handler_et import PostgresTransform
+from etl.listings import build_film_listings
+from services.cache import RedisCacheRepository
+from services.entities import EntityDictionary
+from services.listings import FilmListings
+from services.services import BaseRepository
+
+CHANGE_FEED_CHANNEL = "content_changes"
+ENTITY_TABLES = ("film_work", "person", "genre")
+LINK_TABLES = {
+    "person_film_work": {"movies": "film_work_id", "persons": "person_id"},
+    "genre_film_work": {"movies": "film_work_id"},
+}
+
+
+class ChangeFeed:
+    """
+    Переносит изменения каталога в Elasticsearch и Redis почти сразу после их записи.
+
+    Триггеры на таблицах content отправляют в канал LISTEN/NOTIFY идентификаторы
+    изменённых строк. Уведомления копятся debounce_ms миллисекунд, так что всплеск
+    изменений обрабатывается одним проходом: по затронутым идентификаторам
+    заново собираются только нужные документы фильмов, людей и жанров,
+    исчезнувшие из PostgreSQL документы удаляются, а из кэша удаляются эти
+    документы и результаты поиска, в которые они вошли. После изменения фильмов
+    перестраиваются списки популярных фильмов, если переданы listings, а после
+    изменения фильмов или персон — словарь сущностей, если передан entities.
+    Уведомления, пришедшие без подписчика, теряются, поэтому периодический ETL
+    по отметкам изменений остаётся страховкой.
+
+    Если передан lock (ETLScheduler.locked), каждая порция изменений
+    применяется под блокировкой ETL: не одновременно с периодическим ETL,
+    который может строить новую версию индекса, и не одновременно с другими
+    экземплярами загрузчика. Если блокировка занята, порция откладывается.
+    """
+
+    def __init__(
+            self,
+            pool: asyncpg.Pool,
+            es: ElasticsearchLoader,
+            cache: RedisCacheRepository,
+            debounce_ms: int = 500,
+            batch_size: int = 100,
+            install_triggers: bool = True,
+            reconnect_delay: float = 5,
+            listings: Optional[FilmListings] = None,
+            entities: Optional[EntityDictionary] = None,
+            lock: Optional[Callable[[], AsyncContextManager[bool]]] = None,
+    ) -> None:
+        self.pool = pool
+        self.es = es
+        self.cache = cache
+        self.debounce = debounce_ms / 1000
+        self.batch_size = batch_size
+        self.install_triggers = install_triggers
+        self.reconnect_delay = reconnect_delay
+        self.listings = listings
+        self.entities = entities
+        self.lock = lock
+        self.transform = PostgresTransform(pool, watermarks={}, batch_size=batch_size)
+        self._pending = self._empty()
+        self._changed = asyncio.Event()
+
+    @staticmethod
+    def _empty() -> dict[str, set[str]]:
+        return {name: set() for name in (*ENTITY_TABLES, "movies", "persons")}
+
+    async def run(self) -> None:
+        """Слушает уведомления и применяет накопленные изменения, пока не будет отменён."""
+        await asyncio.gather(self._listen_forever(), self._apply_forever())
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        """Запоминает идентификаторы из уведомления об изменении строки."""
+        try:
+            change = orjson.loads(payload)
+            table = change["table"]
+            ids = {table: change["id"]} if table in ENTITY_TABLES else {}
+            for index_name, column in LINK_TABLES.get(table, {}).items():
+                ids[index_name] = change[column]
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Некорректное уведомление в канале {channel}: {payload!r} ({e!r})")
+            return
+
+        for name, doc_id in ids.items():
+            self._pending[name].add(doc_id)
+        self._changed.set()
+
+    async def _listen_forever(self) -> None:
+        """Держит подписку на канал, переподключаясь после обрывов соединения."""
+        while True:
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logging.warning(f"Подписка на изменения PostgreSQL прервана: {e}")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _listen(self) -> None:
+        """Подписывается на канал изменений и ждёт закрытия соединения."""
+        async with self.pool.acquire() as conn:
+            if self.install_triggers:
+                await conn.execute(await self.transform.read_sql_file("change_feed.sql"))
+                self.install_triggers = False
+
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            await conn.add_listener(CHANGE_FEED_CHANNEL, self._on_notify)
+            logging.info(f"Подписка на канал изменений {CHANGE_FEED_CHANNEL} установлена.")
+            try:
+                await closed.wait()
+            finally:
+                if not conn.is_closed():
+                    await conn.remove_listener(CHANGE_FEED_CHANNEL, self._on_notify)
+
+    async def _apply_forever(self) -> None:
+        """Применяет изменения, накопленные за окно debounce."""
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.debounce)
+            self._changed.clear()
+            pending, self._pending = self._pending, self._empty()
+            try:
+                applied = await self._apply_locked(pending)
+            except Exception as e:
+                logging.exception(f"Ошибка применения изменений из PostgreSQL: {e}")
+                applied = False
+            if not applied:
+                for name, ids in pending.items():
+                    self._pending[name] |= ids
+                self._changed.set()
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _apply_locked(self, pending: dict[str, set[str]]) -> bool:
+        """Применяет изменения под блокировкой ETL; возвращает False, если она занята."""
+        if self.lock is None:
+            await self.apply(pending)
+            return True
+
+        async with self.lock() as acquired:
+            if not acquired:
+                logging.info("Блокировка ETL занята, изменения из PostgreSQL будут применены позже.")
+                return False
+            await self.apply(pending)
+            return True
+
+    async def apply(self, pending: dict[str, set[str]]) -> dict[str, int]:
+        """Обновляет документы, затронутые изменениями, и возвращает их количество по индексам."""
+        affected = await self.transform.fetch_affected_ids(
+            film_work_ids=list(pending["film_work"]),
+            person_ids=list(pending["person"]),
+            genre_ids=list(pending["genre"]),
+        )
+        documents = {
+            "movies": pending["movies"] | pending["film_work"] | affected["movies"],
+            "persons": pending["persons"] | pending["person"] | affected["persons"],
+            "genres": pending["genre"],
+        }
+
+        updated = {}
+        for index_name, ids in documents.items():
+            if ids:
+                updated[index_name] = await self._reindex(index_name, sorted(ids))
+        if "movies" in updated and self.listings is not None:
+            await build_film_listings(self.es.es, self.listings)
+        if {"movies", "persons"} & set(updated) and self.entities is not None:
+            await build_entity_dictionary(self.es.es, self.entities)
+        if updated:
+            logging.info(f"Изменения из PostgreSQL применены: {updated}")
+        return updated
+
+    async def _reindex(self, index_name: str, ids: list[str]) -> int:
+        """
+        Заново индексирует документы по идентификаторам и вытесняет их из кэша.
+
+        Перед инвалидацией индекс обновляется, чтобы поиск, выполненный сразу
+        после неё, не вернул в кэш прежние версии документов.
+        """
+        for i in range(0, len(ids), self.batch_size):
+            chunk = ids[i:i + self.batch_size]
+            models = await self.transform.fetch_documents(index_name, chunk)
+            found = {model.id for model in models}
+            missing = [doc_id for doc_id in chunk if doc_id not in found]
+
+            await self.es.load_data(index_name, self._single(models))
+            if missing:
+                await self.es.delete_data(index_name, missing)
+            await self.es.es.indices.refresh(index=index_name)
+            await self.cache.invalidate(
+                [BaseRepository._get_cache_key(index_name, doc_id) for doc_id in chunk]
+            )
+        return len(ids)
+
+    @staticmethod
+    async def _single(models: list) -> AsyncIterator[list]:
+        """Оборачивает одну порцию моделей в поток для ElasticsearchLoader.load_data."""
+        yield models
@@ -0,0 +1,75 @@
+import logging
+from collections import defaultdict
+from typing import Any, Callable
+
+from elasticsearch import AsyncElasticsearch, helpers
+
+from services.entities import EntityDictionary
+
+
+async def collect_entries(
+        es_conn: AsyncElasticsearch,
+        index_name: str,
+        name_field: str,
+        popularity: Callable[[dict[str, Any]], float],
+        source_fields: list[str],
+        surname_alias: bool = False,
+) -> list[tuple[str, float, list[str]]]:
+    """
+    Возвращает названия документов индекса и их варианты с популярностью и идентификаторами.
+
+    Идентификаторы с одинаковым названием упорядочиваются по убыванию
+    popularity(source), а популярностью названия считается популярность
+    первого из них. При surname_alias для имён из нескольких слов
+    добавляется вариант из последнего слова, чтобы персону находили по фамилии.
+    """
+    documents = defaultdict(list)
+    async for hit in helpers.async_scan(
+            es_conn, index=index_name, query={"_source": [name_field, *source_fields]}
+    ):
+        source = hit["_source"]
+        name = source.get(name_field)
+        if not name:
+            continue
+        documents[name].append((popularity(source), hit["_id"]))
+        words = name.split()
+        if surname_alias and len(words) > 1:
+            documents[words[-1]].append((popularity(source), hit["_id"]))
+
+    entries = []
+    for name, items in documents.items():
+        items.sort(key=lambda item: item[0], reverse=True)
+        entries.append((name, items[0][0], [doc_id for _, doc_id in items]))
+    return entries
+
+
+async def build_entity_dictionary(es_conn: AsyncElasticsearch, dictionary: EntityDictionary) -> int:
+    """
+    Строит словарь названий фильмов и имён персон и сохраняет его в Redis.
+
+    Фильмы с одинаковым названием упорядочиваются по рейтингу, персоны —
+    по количеству фильмов. Возвращает новую версию словаря.
+    """
+    entries = {
+        "movies": await collect_entries(
+            es_conn,
+            "movies",
+            "title",
+            popularity=lambda source: source.get("imdb_rating") or 0,
+            source_fields=["imdb_rating"],
+        ),
+        "persons": await collect_entries(
+            es_conn,
+            "persons",
+            "full_name",
+            popularity=lambda source: len(source.get("films") or []),
+            source_fields=["films.id"],
+            surname_alias=True,
+        ),
+    }
+    version = await dictionary.save(entries)
+    logging.info(
+        f"Построен словарь сущностей версии {version}: "
+        f"{len(entries['movies'])} фильмов, {len(entries['persons'])} персон"
+    )
+    return version
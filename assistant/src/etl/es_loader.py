@@ -1,13 +1,24 @@
 import asyncio
+import copy
+import hashlib
 import json
 import logging
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 
 import aiofiles
-from elasticsearch import AsyncElasticsearch, helpers
+from elasticsearch import AsyncElasticsearch, NotFoundError, helpers
+from pydantic import BaseModel
 
-from core.config import ELASTIC_SCHEMES_PATH
+from core.config import ELASTIC_SCHEMES_PATH, settings
 from etl.handler_et import handler_et_process
+from etl.pipeline import buffered, run_parallel
+from etl.state import State
+from services.cache import RedisCacheRepository
+
+INVALIDATE_BATCH_SIZE = 1000
 
 
 class ElasticsearchLoader:
@@ -16,53 +27,252 @@ class ElasticsearchLoader:
     индексов и массовую отправку данных.
 
     Методы:
-        load_data(index_name, data): Подготавливает данные и отправляет их
-        в Elasticsearch с использованием bulk API.
-        async_bulk_index(es, actions): Выполняет массовую загрузку данных в Elasticsearch.
+        load_data(index_name, batches, bulk_mode): Потоково подготавливает порции
+        данных и отправляет их в Elasticsearch с использованием bulk API.
+        delete_data(index_name, ids): Удаляет документы из индекса.
+        parallel_bulk_index(actions): Распределяет загрузку между параллельными потоками.
+        async_bulk_index(actions): Выполняет потоковую массовую загрузку данных в Elasticsearch.
+        bulk_index_settings(index_name): Переводит индекс в режим массовой загрузки.
+        needs_rebuild(alias, schema): Проверяет, нужна ли новая версия индекса.
+        create_versioned_index(alias, schema): Создаёт индекс следующей версии.
+        validate_count(index_name, expected): Сверяет количество документов с PostgreSQL.
+        swap_alias(alias, index_name): Атомарно переключает псевдоним на новую версию.
+        delete_old_versions(alias, keep): Удаляет старые версии индекса.
         indices_exists(index_name): Проверяет, существует ли индекс в Elasticsearch.
         create_index(index_name, schema): Создаёт индекс в Elasticsearch с заданной схемой.
         get_schema(schema_path): Получает схему индекса из указанного файла.
     """
 
-    def __init__(self, es: AsyncElasticsearch):
+    def __init__(
+            self,
+            es: AsyncElasticsearch,
+            chunk_size: int = 500,
+            queue_size: int = 4,
+            max_chunk_bytes: int = 10 * 1024 * 1024,
+            workers: int = 1,
+            max_retries: int = 0,
+            initial_backoff: float = 2,
+            max_backoff: float = 600,
+    ):
         self.es = es
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.workers = workers
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.stats: dict[str, dict] = {}
 
-    async def load_data(self, index_name, data):
-        """Подготавливает данные и отправляет их в Elasticsearch с использованием bulk API."""
-        actions = [
-            {"_index": index_name, "_id": item.id, "_source": item.model_dump()}
-            for item in data
-        ]
+    async def load_data(
+            self,
+            index_name,
+            batches: AsyncIterator[list[BaseModel]],
+            bulk_mode: bool = False,
+    ) -> int:
+        """
+        Потоково отправляет порции моделей в Elasticsearch с использованием bulk API.
+
+        Порции читаются через очередь не длиннее queue_size, а действия bulk
+        формируются по мере чтения, поэтому весь индекс в памяти не собирается.
+        Действия распределяются между workers параллельными запросами bulk.
+        В режиме bulk_mode на время загрузки у индекса отключаются обновление
+        и реплики. Возвращает количество отправленных документов.
+        """
+        async def actions() -> AsyncIterator[dict]:
+            async for batch in buffered(batches, self.queue_size):
+                for item in batch:
+                    yield {"_index": index_name, "_id": item.id, "_source": item.model_dump()}
 
+        start = time.perf_counter()
         try:
-            await self.async_bulk_index(self.es, actions)
-            logging.info(f"Успешно {len(actions)} данных отправлены в Elasticsearch")
+            if bulk_mode:
+                async with self.bulk_index_settings(index_name):
+                    loaded = await self.parallel_bulk_index(actions())
+            else:
+                loaded = await self.parallel_bulk_index(actions())
         except Exception as e:
             logging.error(f"Ошибка при отправке данных в Elasticsearch: {e}")
             raise
 
-    @staticmethod
-    async def async_bulk_index(es, actions):
-        """Асинхронная массовая загрузка данных в Elasticsearch с использованием хелпера async_bulk."""
-        await helpers.async_bulk(es, actions)
+        elapsed = time.perf_counter() - start
+        docs_per_sec = round(loaded / elapsed, 1) if elapsed else 0.0
+        self.stats[index_name] = {
+            "docs": loaded,
+            "seconds": round(elapsed, 3),
+            "docs_per_sec": docs_per_sec,
+        }
+        if loaded:
+            logging.info(
+                f"Успешно {loaded} данных отправлены в индекс {index_name} "
+                f"за {elapsed:.2f} с ({docs_per_sec} док/с)"
+            )
+        else:
+            logging.info(f"Нет изменений для индекса {index_name}")
+        return loaded
+
+    async def delete_data(self, index_name, ids: list[str]) -> int:
+        """Удаляет документы из индекса, пропуская уже отсутствующие, и возвращает их количество."""
+        actions = [{"_op_type": "delete", "_index": index_name, "_id": doc_id} for doc_id in ids]
+        deleted, errors = await helpers.async_bulk(self.es, actions, raise_on_error=False)
+        errors = [error for error in errors if error["delete"]["status"] != 404]
+        if errors:
+            raise RuntimeError(f"Ошибка при удалении документов из индекса {index_name}: {errors[:3]}")
+        return deleted
+
+    async def parallel_bulk_index(self, actions: AsyncIterator[dict]) -> int:
+        """Загружает действия bulk в workers параллельных потоков."""
+        loaded = await run_parallel(
+            actions,
+            self.async_bulk_index,
+            concurrency=self.workers,
+            maxsize=self.chunk_size * self.workers,
+        )
+        return sum(loaded)
+
+    async def async_bulk_index(self, actions: AsyncIterator[dict]) -> int:
+        """
+        Асинхронная потоковая загрузка данных в Elasticsearch с использованием хелпера async_streaming_bulk.
+
+        Запрос bulk отправляется, как только набирается chunk_size документов или
+        max_chunk_bytes байт. Документы, отклонённые с кодом 429, повторяются до
+        max_retries раз с экспоненциальной задержкой от initial_backoff до max_backoff.
+        """
+        loaded = 0
+        async for _ in helpers.async_streaming_bulk(
+                self.es,
+                actions,
+                chunk_size=self.chunk_size,
+                max_chunk_bytes=self.max_chunk_bytes,
+                max_retries=self.max_retries,
+                initial_backoff=self.initial_backoff,
+                max_backoff=self.max_backoff,
+        ):
+            loaded += 1
+        return loaded
+
+    @asynccontextmanager
+    async def bulk_index_settings(self, index_name) -> AsyncIterator[None]:
+        """
+        Переводит индекс в режим массовой загрузки и восстанавливает настройки после неё.
+
+        На время загрузки отключается периодическое обновление и реплики, после
+        загрузки прежние значения возвращаются и индекс принудительно обновляется.
+        """
+        current = await self.es.indices.get_settings(
+            index=index_name, name="index.refresh_interval,index.number_of_replicas"
+        )
+        index_settings = next(iter(current.values()))["settings"]["index"]
+        restore = {
+            "refresh_interval": index_settings.get("refresh_interval"),
+            "number_of_replicas": index_settings.get("number_of_replicas"),
+        }
+
+        logging.info(f"Индекс {index_name} переведён в режим массовой загрузки.")
+        await self.es.indices.put_settings(
+            index=index_name,
+            body={"index": {"refresh_interval": "-1", "number_of_replicas": 0}},
+        )
+        try:
+            yield
+        finally:
+            await self.es.indices.put_settings(index=index_name, body={"index": restore})
+            await self.es.indices.refresh(index=index_name)
+            logging.info(f"Настройки индекса {index_name} восстановлены.")
 
     async def indices_exists(self, index_name) -> bool:
         """Проверяет существование индекса в Elasticsearch."""
         return await self.es.indices.exists(index=index_name)
 
-    async def create_index(self, index_name, schema) -> None:
+    async def create_index(self, index_name, schema) -> bool:
         """Создаёт индекс в Elasticsearch с заданной схемой, если он не существует."""
         try:
             if await self.indices_exists(index_name):
                 logging.info(f"Индекс {index_name} уже существует.")
-            else:
-                logging.info(f"Создаем индекс {index_name} с заданной схемой.")
-                await self.es.indices.create(index=index_name, body=schema)
-                logging.info(f"Индекс {index_name} успешно создан.")
+                return False
+
+            logging.info(f"Создаем индекс {index_name} с заданной схемой.")
+            await self.es.indices.create(index=index_name, body=schema)
+            logging.info(f"Индекс {index_name} успешно создан.")
+            return True
         except Exception as e:
             logging.error(f"Ошибка при создании индекса {index_name}: {e}")
             raise
 
+    @staticmethod
+    def schema_hash(schema: dict) -> str:
+        """Возвращает хэш схемы индекса."""
+        return hashlib.md5(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+    async def get_alias_indices(self, alias: str) -> list[str]:
+        """Возвращает индексы, на которые указывает псевдоним."""
+        try:
+            return list(await self.es.indices.get_alias(name=alias))
+        except NotFoundError:
+            return []
+
+    async def get_versions(self, alias: str) -> dict[int, str]:
+        """Возвращает версионированные индексы псевдонима по номерам версий."""
+        indices = await self.es.indices.get(index=f"{alias}_v*")
+        versions = {}
+        for index_name in indices:
+            version = index_name[len(alias) + 2:]
+            if version.isdigit():
+                versions[int(version)] = index_name
+        return versions
+
+    async def needs_rebuild(self, alias: str, schema: dict) -> bool:
+        """Проверяет, что псевдонима нет или его индекс построен по другой схеме."""
+        indices = await self.get_alias_indices(alias)
+        if not indices:
+            return True
+
+        mapping = await self.es.indices.get_mapping(index=indices[0])
+        meta = mapping[indices[0]]["mappings"].get("_meta", {})
+        return meta.get("schema_hash") != self.schema_hash(schema)
+
+    async def create_versioned_index(self, alias: str, schema: dict) -> str:
+        """Создаёт индекс следующей версии для псевдонима и возвращает его имя."""
+        versions = await self.get_versions(alias)
+        index_name = f"{alias}_v{max(versions, default=0) + 1}"
+
+        body = copy.deepcopy(schema)
+        body.setdefault("mappings", {})["_meta"] = {"schema_hash": self.schema_hash(schema)}
+        await self.create_index(index_name, body)
+        return index_name
+
+    async def validate_count(self, index_name: str, expected: int) -> None:
+        """Проверяет, что в индексе не меньше документов, чем в PostgreSQL."""
+        count = (await self.es.count(index=index_name))["count"]
+        if count < expected:
+            raise ValueError(
+                f"В индексе {index_name} {count} документов, в PostgreSQL {expected}"
+            )
+        logging.info(f"Индекс {index_name} проверен: {count} документов.")
+
+    async def swap_alias(self, alias: str, index_name: str) -> None:
+        """Атомарно переключает псевдоним на индекс index_name."""
+        actions = [
+            {"remove": {"index": old_index, "alias": alias}}
+            for old_index in await self.get_alias_indices(alias)
+        ]
+        if not actions and await self.indices_exists(alias):
+            actions.append({"remove_index": {"index": alias}})
+        actions.append({"add": {"index": index_name, "alias": alias}})
+
+        await self.es.indices.update_aliases(body={"actions": actions})
+        logging.info(f"Псевдоним {alias} переключён на индекс {index_name}.")
+
+    async def delete_old_versions(self, alias: str, keep: int) -> None:
+        """Удаляет старые версии индекса, оставляя keep последних; текущая версия не удаляется."""
+        current = set(await self.get_alias_indices(alias))
+        versions = await self.get_versions(alias)
+        for version in sorted(versions)[:-keep or None]:
+            index_name = versions[version]
+            if index_name not in current:
+                await self.es.indices.delete(index=index_name)
+                logging.info(f"Удалён старый индекс {index_name}.")
+
     @staticmethod
     async def get_schema(schema_path: str):
         """Получает схему индекса из файла."""
@@ -80,28 +290,122 @@ class ElasticsearchLoader:
             raise
 
 
-async def load_data_to_elasticsearch(es_conn):
+async def track_ids(batches: AsyncIterator[list[BaseModel]], ids: set[str]) -> AsyncIterator[list[BaseModel]]:
+    """Пропускает порции моделей дальше, запоминая их идентификаторы в ids."""
+    async for batch in batches:
+        ids.update(item.id for item in batch)
+        yield batch
+
+
+async def invalidate_cache(
+        es_conn, cache: RedisCacheRepository, updated: dict[str, set[str]], rebuilt: list[str]
+) -> None:
+    """
+    Удаляет из кэша обновлённые документы и результаты поиска, в которые они вошли.
+
+    Для перестроенных индексов удаляются все их записи. Индексы обновляются
+    заранее, чтобы поиск сразу после инвалидации видел новые версии документов.
+    """
+    for alias in rebuilt:
+        await cache.invalidate_prefix(f"{alias}:")
+
+    for alias, ids in updated.items():
+        if not ids:
+            continue
+        await es_conn.indices.refresh(index=alias)
+        keys = sorted(f"{alias}:{doc_id}" for doc_id in ids)
+        for i in range(0, len(keys), INVALIDATE_BATCH_SIZE):
+            await cache.invalidate(keys[i:i + INVALIDATE_BATCH_SIZE])
+
+
+def get_schema_paths() -> dict[str, str]:
+    """Возвращает пути к файлам схем по именам индексов."""
+    return {
+        file_name.split(".")[0]: os.path.join(ELASTIC_SCHEMES_PATH, file_name)
+        for file_name in os.listdir(ELASTIC_SCHEMES_PATH)
+    }
+
+
+async def get_missing_indices(es_conn) -> list[str]:
+    """Возвращает имена индексов, которых ещё нет в Elasticsearch."""
+    es = ElasticsearchLoader(es_conn)
+    return [
+        index_name
+        for index_name in get_schema_paths()
+        if not await es.indices_exists(index_name)
+    ]
+
+
+async def load_data_to_elasticsearch(
+        es_conn, state: State, reindex: bool = False, cache: Optional[RedisCacheRepository] = None
+) -> int:
     """Загружает схемы индексов и данные в Elasticsearch.
 
     Осуществляет:
     1. Загрузку всех схем из файлов, содержащихся в директории.
-    2. Проверку и создание недостающих индексов на основе загруженных схем.
-    3. Получение обработанных данных из ETL процесса.
-    4. Асинхронную загрузку данных в соответствующие индексы.
+    2. Создание новой версии индекса, если псевдонима ещё нет, схема изменилась,
+       отметок изменений нет или запрошена переиндексация.
+    3. Получение из ETL процесса потоков данных: полных для новых версий
+       и изменившихся с прошлого запуска для остальных индексов.
+    4. Асинхронную потоковую загрузку данных в соответствующие индексы:
+       извлечение, преобразование и индексация идут одновременно.
+    5. Проверку количества документов в новых версиях, атомарное переключение
+       псевдонимов на них и удаление старых версий.
+    6. Сохранение новых отметок изменений после успешной загрузки.
+    7. Удаление из cache, если он передан, загруженных документов и
+       результатов поиска, в которые они вошли.
+
+    Пока новая версия строится в режиме массовой загрузки, поиск продолжает
+    работать со старой через псевдоним. Скорость индексации по каждому индексу
+    сохраняется в статус ETL. Возвращает количество загруженных документов.
     """
-    directory_path = ELASTIC_SCHEMES_PATH
+    es = ElasticsearchLoader(
+        es_conn,
+        chunk_size=settings.etl_bulk_chunk_size,
+        queue_size=settings.etl_queue_size,
+        max_chunk_bytes=settings.etl_bulk_max_chunk_bytes,
+        workers=settings.etl_bulk_workers,
+        max_retries=settings.etl_bulk_max_retries,
+        initial_backoff=settings.etl_bulk_initial_backoff,
+        max_backoff=settings.etl_bulk_max_backoff,
+    )
+    watermarks = await state.get_watermarks()
 
-    es = ElasticsearchLoader(es_conn)
-    for file_path in os.listdir(directory_path):
-        file_name = file_path.split(".")[0]
-        schema = await es.get_schema(os.path.join(directory_path, file_path))
-        await es.create_index(file_name, schema)
+    rebuild = {}
+    for alias, schema_path in get_schema_paths().items():
+        schema = await es.get_schema(schema_path)
+        if reindex or not watermarks or await es.needs_rebuild(alias, schema):
+            rebuild[alias] = await es.create_versioned_index(alias, schema)
 
-    results = await handler_et_process()
+    updated = {}
+    try:
+        async with handler_et_process(watermarks, frozenset(rebuild)) as (streams, new_watermarks, counts):
+            for alias in streams:
+                if cache is not None and alias not in rebuild:
+                    updated[alias] = set()
+                    streams[alias] = track_ids(streams[alias], updated[alias])
+            elastic_tasks = [
+                asyncio.create_task(
+                    es.load_data(rebuild.get(alias, alias), batches, bulk_mode=alias in rebuild)
+                )
+                for alias, batches in streams.items()
+            ]
+            loaded = sum(await asyncio.gather(*elastic_tasks))
 
-    elastic_tasks = [
-        asyncio.create_task(es.load_data(index_name, data))
-        for index_name, data in results
-    ]
+        for alias, index_name in rebuild.items():
+            await es.validate_count(index_name, counts[alias])
+    except Exception:
+        for index_name in rebuild.values():
+            await es_conn.indices.delete(index=index_name, ignore_unavailable=True)
+        raise
+
+    for alias, index_name in rebuild.items():
+        await es.swap_alias(alias, index_name)
+        await es.delete_old_versions(alias, settings.etl_index_keep_versions)
 
-    await asyncio.gather(*elastic_tasks)
+    await state.set_watermarks(new_watermarks)
+    if cache is not None:
+        await invalidate_cache(es_conn, cache, updated, list(rebuild))
+    await state.set_status(last_indexing=es.stats)
+    logging.info(f"ETL завершён, загружено документов: {loaded}")
+    return loaded
@@ -1,12 +1,26 @@
-import asyncio
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import AsyncIterator, Optional
 
 import aiofiles
 import asyncpg
+import orjson
+from pydantic import BaseModel
 
 from core.config import SQL_FILE_ROOT, settings
-from models.models import Film, Genre, Person, PersonFilm
+from etl.pipeline import buffered
+from models.models import Film, Genre, PersonFilm
+
+MIN_UUID = "00000000-0000-0000-0000-000000000000"
+DEFAULT_MODIFIED_TIME = datetime.strptime("1978.04.03", "%Y.%m.%d")
+INDEX_NAMES = ("genres", "persons", "movies")
+DOCUMENT_QUERIES = {
+    "movies": "movie.sql",
+    "persons": "person_film_work.sql",
+    "genres": "genre_by_id.sql",
+}
+WATERMARK_ENTITIES = ("film_work", "person", "genre", "person_film_work", "genre_film_work")
 
 
 class PostgresTransform:
@@ -14,12 +28,29 @@ class PostgresTransform:
     Класс PostgresTransform отвечает за извлечение данных из PostgreSQL,
     их предварительную обработку и преобразование в модели для загрузки
     в Elasticsearch.
+
+    Данные читаются порциями по batch_size записей и преобразуются по мере
+    поступления; между извлечением и преобразованием стоит очередь не длиннее
+    queue_size порций. Без отметок watermarks выполняется полная загрузка:
+    фильмы и люди перебираются постранично по первичному ключу, и документы
+    каждой страницы собираются по индексам таблиц связей, так что стоимость
+    извлечения растёт линейно с размером каталога.
     """
 
-    def __init__(self, pool, modified_time: datetime, batch_size: int = 100):
+    def __init__(
+            self,
+            pool,
+            watermarks: dict[str, datetime],
+            batch_size: int = 100,
+            queue_size: int = 4,
+    ):
         self.pool = pool
         self.batch_size = batch_size
-        self.modified_time = modified_time
+        self.queue_size = queue_size
+        self.full = not watermarks
+        self.watermarks = {
+            entity: watermarks.get(entity, DEFAULT_MODIFIED_TIME) for entity in WATERMARK_ENTITIES
+        }
 
     @staticmethod
     async def read_sql_file(filepath: str) -> str:
@@ -29,9 +60,8 @@ class PostgresTransform:
 
         return sql_query
 
-    async def fetch_with_cursor(self, sql_command: str, params: tuple) -> list:
-        """Извлекает данные из PostgreSQL, используя курсор."""
-        results = []
+    async def iter_with_cursor(self, sql_command: str, params: tuple) -> AsyncIterator[list]:
+        """Извлекает данные из PostgreSQL через курсор, отдавая их порциями размера batch_size."""
         async with self.pool.acquire() as conn:
             async with conn.transaction():
                 cursor = await conn.cursor(sql_command, *params)
@@ -40,32 +70,116 @@ class PostgresTransform:
                     data = await cursor.fetch(self.batch_size)
                     if not data:
                         break
-                    results.extend(data)
-        return results
+                    yield data
+
+    async def iter_keyset(self, sql_command: str) -> AsyncIterator[list]:
+        """
+        Извлекает данные постранично по возрастанию id, по batch_size записей.
+
+        Каждая страница начинается после последнего id предыдущей, поэтому
+        запрос читает только свою часть индекса первичного ключа.
+        """
+        last_id = MIN_UUID
+        while True:
+            records = await self.fetch(sql_command, (last_id, self.batch_size))
+            if not records:
+                break
+            yield records
+            last_id = records[-1]["id"]
+
+    async def fetch(self, sql_command: str, params: tuple) -> list:
+        """Извлекает данные из PostgreSQL одним запросом."""
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql_command, *params)
+
+    async def fetch_watermarks(self) -> dict[str, Optional[datetime]]:
+        """Возвращает текущие наибольшие отметки изменений по сущностям."""
+        sql_query = await self.read_sql_file("watermarks.sql")
+        async with self.pool.acquire() as conn:
+            return dict(await conn.fetchrow(sql_query))
 
-    async def load_genre(self) -> list:
-        """Извлекает данные о жанрах из PostgreSQL."""
+    async def fetch_counts(self) -> dict[str, int]:
+        """Возвращает количество документов каждого индекса при полной загрузке."""
+        sql_query = await self.read_sql_file("counts.sql")
+        async with self.pool.acquire() as conn:
+            return dict(await conn.fetchrow(sql_query))
+
+    def stream(self, index_name: str) -> AsyncIterator[list[BaseModel]]:
+        """Возвращает поток порций моделей для индекса."""
+        return {
+            "genres": self.fetch_genre_from_postgres,
+            "persons": self.fetch_person_film_work_from_postgres,
+            "movies": self.fetch_movie_from_postgres,
+        }[index_name]()
+
+    async def iter_by_ids(self, sql_command: str, ids_query: AsyncIterator[list]) -> AsyncIterator[list]:
+        """Для каждой порции идентификаторов из ids_query извлекает данные по sql_command."""
+        async for records in ids_query:
+            yield await self.fetch(sql_command, ([record["id"] for record in records],))
+
+    async def load_genre(self) -> AsyncIterator[list]:
+        """Извлекает изменившиеся жанры из PostgreSQL."""
         sql_query = await self.read_sql_file("genre.sql")
-        return await self.fetch_with_cursor(sql_query, (self.modified_time,))
+        async for records in self.iter_with_cursor(sql_query, (self.watermarks["genre"],)):
+            yield records
 
-    async def load_person(self) -> list:
-        """Извлекает данные о людях из PostgreSQL."""
-        sql_query = await self.read_sql_file("person.sql")
-        return await self.fetch_with_cursor(sql_query, (self.modified_time,))
+    async def load_changed_person_ids(self) -> AsyncIterator[list]:
+        """
+        Извлекает идентификаторы людей, изменившихся сами или через свои фильмы.
 
-    async def load_person_film_work(self) -> list:
-        """Извлекает данные о связях между людьми и фильмами из PostgreSQL."""
+        При полной загрузке отдаёт всех людей постранично по первичному ключу.
+        """
+        if self.full:
+            async for records in self.iter_keyset(await self.read_sql_file("person_page.sql")):
+                yield records
+            return
+
+        sql_query = await self.read_sql_file("person.sql")
+        async for records in self.iter_with_cursor(
+                sql_query,
+                (
+                    self.watermarks["person"],
+                    self.watermarks["film_work"],
+                    self.watermarks["person_film_work"],
+                ),
+        ):
+            yield records
+
+    async def load_changed_film_work_ids(self) -> AsyncIterator[list]:
+        """
+        Извлекает идентификаторы фильмов, изменившихся сами или через людей и жанры.
+
+        При полной загрузке отдаёт все фильмы постранично по первичному ключу.
+        """
+        if self.full:
+            async for records in self.iter_keyset(await self.read_sql_file("film_work_page.sql")):
+                yield records
+            return
+
+        sql_query = await self.read_sql_file("film_work.sql")
+        async for records in self.iter_with_cursor(
+                sql_query,
+                (
+                    self.watermarks["film_work"],
+                    self.watermarks["person"],
+                    self.watermarks["genre"],
+                    self.watermarks["person_film_work"],
+                    self.watermarks["genre_film_work"],
+                ),
+        ):
+            yield records
+
+    async def load_person_film_work(self) -> AsyncIterator[list]:
+        """Извлекает данные о связях между изменившимися людьми и фильмами из PostgreSQL."""
         sql_query = await self.read_sql_file("person_film_work.sql")
-        return await self.fetch_with_cursor(sql_query, (self.modified_time,))
+        async for records in self.iter_by_ids(sql_query, self.load_changed_person_ids()):
+            yield records
 
-    async def load_movie(self, persons: list) -> list:
-        """Извлекает данные о фильмах на основе списка лиц."""
-        persons_idx = [person.id for person in persons]
+    async def load_movie(self) -> AsyncIterator[list]:
+        """Извлекает данные об изменившихся фильмах из PostgreSQL."""
         sql_query = await self.read_sql_file("movie.sql")
-
-        return await self.fetch_with_cursor(
-            sql_query, (self.modified_time, persons_idx)
-        )
+        async for records in self.iter_by_ids(sql_query, self.load_changed_film_work_ids()):
+            yield records
 
     @staticmethod
     async def identify_person_film(data: list) -> list:
@@ -80,7 +194,7 @@ class PostgresTransform:
                     "id": record["film_work_id"],
                     "title": record["title"],
                     "imdb_rating": record["imdb_rating"],
-                    "roles": record["roles"].split(", "),
+                    "roles": record["roles"],
                 }
             )
 
@@ -88,107 +202,102 @@ class PostgresTransform:
             {"id": person_id, **details} for person_id, details in grouped_data.items()
         ]
 
-    async def fetch_person_film_work_from_postgres(self) -> list:
+    async def to_models(self, index_name: str, records: list) -> list[BaseModel]:
+        """Преобразует записи PostgreSQL в модели документов индекса."""
+        if index_name == "movies":
+            return [Film.model_validate(dict(movie)) for movie in records]
+        if index_name == "persons":
+            return [PersonFilm(**item) for item in await self.identify_person_film(records)]
+        return [Genre(id=genre["id"], name=genre["name"]) for genre in records]
+
+    async def fetch_person_film_work_from_postgres(self) -> AsyncIterator[list[PersonFilm]]:
         """Извлекает и преобразует данные о связях лиц и фильмов из PostgreSQL."""
-        load_person_film_work = await self.load_person_film_work()
-        return [
-            PersonFilm(**item)
-            for item in await self.identify_person_film(load_person_film_work)
-        ]
+        async for records in buffered(self.load_person_film_work(), self.queue_size):
+            yield await self.to_models("persons", records)
 
-    async def fetch_genre_from_postgres(self) -> list:
+    async def fetch_genre_from_postgres(self) -> AsyncIterator[list[Genre]]:
         """Извлекает и преобразует данные о жанрах из PostgreSQL."""
-        load_genre = await self.load_genre()
-        return [Genre(id=genre["id"], name=genre["name"]) for genre in load_genre]
+        async for records in buffered(self.load_genre(), self.queue_size):
+            yield await self.to_models("genres", records)
 
-    async def fetch_person_from_postgres(self) -> list:
-        """Извлекает и преобразует данные о людях из PostgreSQL."""
-        load_person = await self.load_person()
-        return [
-            Person(id=person["id"], full_name=person["full_name"])
-            for person in load_person
-        ]
-
-    async def fetch_movie_from_postgres(self) -> list:
+    async def fetch_movie_from_postgres(self) -> AsyncIterator[list[Film]]:
         """Извлекает и преобразует данные о фильмах из PostgreSQL."""
-        load_movie = await self.load_movie(await self.fetch_person_from_postgres())
-        film = []
-        for movie in load_movie:
-            role_person = await self.identify_person_role(movie)
-            genres = await self.identify_genre(movie)
-            film.append(
-                Film(
-                    id=movie["film_work_id"],
-                    title=movie["title"],
-                    imdb_rating=movie["imdb_rating"],
-                    description=movie["description"],
-                    genre=genres,
-                    actors=role_person["actor"],
-                    writers=role_person["writer"],
-                    directors=role_person["director"],
-                )
-            )
-
-        return film
-
-    @staticmethod
-    async def identify_genre(movie: dict) -> list:
-        """Извлекает жанры из данных фильма."""
-        genres = []
-        for item in movie["genres"].split(", "):
-            genre_id, genre_name = item.split(":")
-            genres.append(Genre(id=genre_id, name=genre_name))
-
-        return genres
-
-    @staticmethod
-    async def zip_person_data(movie: dict):
-        """Объединяет данные о лицах и ролях."""
-        person_ids = movie["person_ids"].split(", ")
-
-        persons_with_roles = [
-            item.split(":") for item in movie["persons_with_roles"].split(", ")
-        ]
-        return zip(person_ids, persons_with_roles)
-
-    async def identify_person_role(self, movie: dict) -> dict:
-        """Извлекает роли лиц из данных фильма."""
-        roles = {"writer": [], "actor": [], "director": []}
-
-        zip_person_data = await self.zip_person_data(movie)
+        async for records in buffered(self.load_movie(), self.queue_size):
+            yield await self.to_models("movies", records)
+
+    async def fetch_documents(self, index_name: str, ids: list[str]) -> list[BaseModel]:
+        """Извлекает и преобразует документы индекса по идентификаторам."""
+        sql_query = await self.read_sql_file(DOCUMENT_QUERIES[index_name])
+        return await self.to_models(index_name, await self.fetch(sql_query, (ids,)))
+
+    async def fetch_affected_ids(
+            self, film_work_ids: list[str], person_ids: list[str], genre_ids: list[str]
+    ) -> dict[str, set[str]]:
+        """
+        Возвращает документы, которые затрагивают изменения сущностей.
+
+        Изменения людей и жанров затрагивают их фильмы, а изменения фильмов —
+        фильмографии их участников.
+        """
+        sql_query = await self.read_sql_file("affected_ids.sql")
+        affected = {"movies": set(), "persons": set()}
+        for record in await self.fetch(sql_query, (person_ids, genre_ids, film_work_ids)):
+            affected[record["index_name"]].add(record["id"])
+        return affected
+
+
+async def init_connection(conn: asyncpg.Connection) -> None:
+    """Настраивает соединение: json и jsonb декодируются в объекты Python через orjson."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog",
+        )
 
-        for person_id, name_role in zip_person_data:
-            full_name, role = name_role
-            if role in roles:
-                roles[role].append(Person(id=person_id, full_name=full_name))
 
-        return roles
+async def create_postgres_pool(**kwargs) -> asyncpg.Pool:
+    """Создаёт пул соединений с PostgreSQL для ETL."""
+    return await asyncpg.create_pool(settings.postgres_url, init=init_connection, **kwargs)
 
 
-async def handler_et_process() -> zip:
+@asynccontextmanager
+async def handler_et_process(
+        watermarks: dict[str, datetime],
+        full_reload: frozenset[str] = frozenset(),
+) -> AsyncIterator[tuple[dict[str, AsyncIterator[list[BaseModel]]], dict[str, Optional[datetime]], dict[str, int]]]:
     """
     Основной процесс ETL для извлечения данных из PostgreSQL и их подготовки
     для дальнейшей загрузки в Elasticsearch.
-    """
-    modified_time = datetime.strptime("1978.04.03", "%Y.%m.%d")
 
-    pool = await asyncpg.create_pool(settings.postgres_url)
+    Отдаёт потоки порций моделей по именам индексов, новые отметки изменений,
+    снятые до начала извлечения (их нужно сохранить после успешной загрузки),
+    и количество документов каждого индекса на тот же момент. Для индексов из
+    full_reload извлекаются все данные, для остальных — только записи,
+    изменившиеся после отметок watermarks, и фильмы, затронутые изменившимися
+    людьми и жанрами. Пул соединений с PostgreSQL закрывается при выходе
+    из контекста.
+    """
+    pool = await create_postgres_pool()
 
     try:
-        data = PostgresTransform(pool, modified_time=modified_time, batch_size=100)
-
-        postgres_data_tasks = {
-            "genres": asyncio.create_task(data.fetch_genre_from_postgres()),
-            "persons": asyncio.create_task(data.fetch_person_film_work_from_postgres()),
-            "movies": asyncio.create_task(data.fetch_movie_from_postgres()),
-        }
-        results = await asyncio.gather(*postgres_data_tasks.values())
+        data, full_data = (
+            PostgresTransform(
+                pool,
+                watermarks=index_watermarks,
+                batch_size=settings.etl_batch_size,
+                queue_size=settings.etl_queue_size,
+            )
+            for index_watermarks in (watermarks, {})
+        )
+        new_watermarks = await data.fetch_watermarks()
+        counts = await data.fetch_counts()
 
-        return zip(postgres_data_tasks.keys(), results)
+        yield {
+            index_name: (full_data if index_name in full_reload else data).stream(index_name)
+            for index_name in INDEX_NAMES
+        }, new_watermarks, counts
 
     finally:
         await pool.close()
-
-
-if __name__ == "__main__":
-    asyncio.run(handler_et_process())
@@ -0,0 +1,62 @@
+import logging
+from typing import Optional
+
+from elasticsearch import AsyncElasticsearch
+
+from services.film import INDEX, build_popular_query
+from services.listings import FilmListings
+
+LISTING_SORTS = ("-imdb_rating", "imdb_rating")
+MAX_GENRES = 1000
+
+
+async def get_genre_ids(es_conn: AsyncElasticsearch) -> list[str]:
+    """Возвращает идентификаторы жанров, у которых есть фильмы."""
+    response = await es_conn.search(
+        index=INDEX,
+        body={
+            "size": 0,
+            "aggs": {
+                "genres": {
+                    "nested": {"path": "genre"},
+                    "aggs": {"ids": {"terms": {"field": "genre.id", "size": MAX_GENRES}}},
+                }
+            },
+        },
+    )
+    return [bucket["key"] for bucket in response["aggregations"]["genres"]["ids"]["buckets"]]
+
+
+async def fetch_ranked_ids(
+        es_conn: AsyncElasticsearch, genre: Optional[str], sort: str, depth: int
+) -> tuple[list[str], int]:
+    """Возвращает первые depth идентификаторов фильмов запроса и общее их количество."""
+    body = {
+        **build_popular_query(genre, sort),
+        "size": depth,
+        "_source": False,
+        "track_total_hits": True,
+    }
+    response = await es_conn.search(index=INDEX, body=body)
+    hits = response["hits"]
+    return [hit["_id"] for hit in hits["hits"]], hits["total"]["value"]
+
+
+async def build_film_listings(es_conn: AsyncElasticsearch, listings: FilmListings) -> int:
+    """
+    Строит ранжированные списки фильмов для всех жанров и сортировок.
+
+    Списки строятся теми же запросами, что выполняет API, поэтому порядок
+    фильмов в них совпадает с выдачей Elasticsearch. Возвращает количество
+    построенных списков.
+    """
+    result = {}
+    for genre in [None, *await get_genre_ids(es_conn)]:
+        for sort in LISTING_SORTS:
+            result[listings.get_key(sort, genre)] = await fetch_ranked_ids(
+                es_conn, genre, sort, listings.depth
+            )
+
+    await listings.save(result)
+    logging.info(f"Построены списки популярных фильмов: {len(result)}")
+    return len(result)
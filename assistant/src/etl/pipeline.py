@@ -0,0 +1,86 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+async def buffered(source: AsyncIterator[T], maxsize: int) -> AsyncIterator[T]:
+    """
+    Читает source в отдельной задаче через очередь не длиннее maxsize элементов.
+
+    Следующая стадия конвейера обрабатывает уже полученные элементы, пока
+    предыдущая готовит новые, а заполненная очередь приостанавливает источник,
+    поэтому в памяти одновременно находится не больше maxsize элементов.
+    Ошибка источника пробрасывается читателю.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def produce() -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+        except Exception:
+            await queue.put(_DONE)
+            raise
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        await queue.put(_DONE)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            yield item
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+
+async def run_parallel(
+        source: AsyncIterator[T],
+        worker: Callable[[AsyncIterator[T]], Awaitable[R]],
+        concurrency: int,
+        maxsize: int,
+) -> list[R]:
+    """
+    Распределяет элементы source между concurrency копиями worker.
+
+    Каждый worker читает свой поток из общей очереди не длиннее maxsize
+    элементов, поэтому элемент достаётся ровно одному из них. Возвращает
+    результаты всех worker; при ошибке любого из них остальные отменяются.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    async def feed() -> None:
+        async for item in source:
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(_DONE)
+
+    async def drain() -> AsyncIterator[T]:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            yield item
+
+    tasks = [asyncio.create_task(feed())] + [
+        asyncio.create_task(worker(drain())) for _ in range(concurrency)
+    ]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return results[1:]
@@ -0,0 +1,11 @@
+SELECT 'movies' AS index_name, pfw.film_work_id::text AS id
+FROM content.person_film_work pfw
+WHERE pfw.person_id = ANY ($1::uuid[])
+UNION
+SELECT 'movies', gfw.film_work_id::text
+FROM content.genre_film_work gfw
+WHERE gfw.genre_id = ANY ($2::uuid[])
+UNION
+SELECT 'persons', pfw.person_id::text
+FROM content.person_film_work pfw
+WHERE pfw.film_work_id = ANY ($3::uuid[])
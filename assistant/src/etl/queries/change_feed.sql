@@ -0,0 +1,46 @@
+CREATE OR REPLACE FUNCTION content.notify_content_change() RETURNS trigger AS
+$$
+DECLARE
+    row_data jsonb;
+BEGIN
+    FOREACH row_data IN ARRAY
+        CASE TG_OP
+            WHEN 'INSERT' THEN ARRAY [to_jsonb(NEW)]
+            WHEN 'DELETE' THEN ARRAY [to_jsonb(OLD)]
+            ELSE ARRAY [to_jsonb(NEW), to_jsonb(OLD)]
+        END
+        LOOP
+            PERFORM pg_notify(
+                'content_changes',
+                jsonb_build_object(
+                    'table', TG_TABLE_NAME,
+                    'id', row_data ->> 'id',
+                    'film_work_id', row_data ->> 'film_work_id',
+                    'person_id', row_data ->> 'person_id',
+                    'genre_id', row_data ->> 'genre_id'
+                )::text
+            );
+        END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER film_work_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_content_change();
+
+CREATE OR REPLACE TRIGGER person_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.person
+    FOR EACH ROW EXECUTE FUNCTION content.notify_content_change();
+
+CREATE OR REPLACE TRIGGER genre_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.genre
+    FOR EACH ROW EXECUTE FUNCTION content.notify_content_change();
+
+CREATE OR REPLACE TRIGGER person_film_work_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.person_film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_content_change();
+
+CREATE OR REPLACE TRIGGER genre_film_work_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.genre_film_work
+    FOR EACH ROW EXECUTE FUNCTION content.notify_content_change();
@@ -0,0 +1,3 @@
+SELECT (SELECT COUNT(*) FROM content.film_work)                  AS movies,
+       (SELECT COUNT(DISTINCT person_id) FROM content.person_film_work) AS persons,
+       (SELECT COUNT(*) FROM content.genre)                      AS genres
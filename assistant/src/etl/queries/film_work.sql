@@ -0,0 +1,15 @@
+SELECT fw.id::text AS id
+FROM content.film_work fw
+WHERE fw.modified > $1
+UNION
+SELECT pfw.film_work_id::text
+FROM content.person_film_work pfw
+         JOIN content.person p ON p.id = pfw.person_id
+WHERE p.modified > $2
+   OR pfw.created > $4
+UNION
+SELECT gfw.film_work_id::text
+FROM content.genre_film_work gfw
+         JOIN content.genre g ON g.id = gfw.genre_id
+WHERE g.modified > $3
+   OR gfw.created > $5
@@ -0,0 +1,5 @@
+SELECT fw.id::text AS id
+FROM content.film_work fw
+WHERE fw.id > $1::uuid
+ORDER BY fw.id
+LIMIT $2
@@ -0,0 +1,3 @@
+SELECT id::text, name
+FROM content.genre
+WHERE id = ANY ($1::uuid[])
@@ -1,15 +1,27 @@
-SELECT fw.id::text as film_work_id, fw.title,
+SELECT fw.id::text                   AS id,
+       fw.title,
        fw.description,
-       STRING_AGG(DISTINCT p.id::text, ', ')                     as person_ids,
-       STRING_AGG(DISTINCT p.full_name || ':' || pfw.role, ', ') as persons_with_roles,
-       STRING_AGG(DISTINCT g.id::text || ':' || g.name, ', ')    as genres,
-       fw.rating                                                 as imdb_rating,
-       fw.created                                                as creation_date
+       fw.rating                     AS imdb_rating,
+       COALESCE(g.genre, '[]')       AS genre,
+       COALESCE(p.actors, '[]')      AS actors,
+       COALESCE(p.writers, '[]')     AS writers,
+       COALESCE(p.directors, '[]')   AS directors
 FROM content.film_work fw
-         LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
-         LEFT JOIN content.person p ON p.id = pfw.person_id
-         LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
-         LEFT JOIN content.genre g ON g.id = gfw.genre_id
-WHERE fw.modified > $1
-  AND pfw.person_id = ANY ($2)
-GROUP BY fw.id, fw.title, fw.description, fw.rating, fw.created;
+         LEFT JOIN LATERAL (
+    SELECT jsonb_agg(DISTINCT jsonb_build_object('id', g.id::text, 'name', g.name)) AS genre
+    FROM content.genre_film_work gfw
+             JOIN content.genre g ON g.id = gfw.genre_id
+    WHERE gfw.film_work_id = fw.id
+    ) g ON TRUE
+         LEFT JOIN LATERAL (
+    SELECT jsonb_agg(DISTINCT jsonb_build_object('id', p.id::text, 'full_name', p.full_name))
+           FILTER (WHERE pfw.role = 'actor')    AS actors,
+           jsonb_agg(DISTINCT jsonb_build_object('id', p.id::text, 'full_name', p.full_name))
+           FILTER (WHERE pfw.role = 'writer')   AS writers,
+           jsonb_agg(DISTINCT jsonb_build_object('id', p.id::text, 'full_name', p.full_name))
+           FILTER (WHERE pfw.role = 'director') AS directors
+    FROM content.person_film_work pfw
+             JOIN content.person p ON p.id = pfw.person_id
+    WHERE pfw.film_work_id = fw.id
+    ) p ON TRUE
+WHERE fw.id = ANY ($1::uuid[]);
@@ -1,4 +1,9 @@
-SELECT id::text, full_name
-FROM content.person
-WHERE modified > $1
-ORDER BY modified
\ No newline at end of file
+SELECT p.id::text AS id
+FROM content.person p
+WHERE p.modified > $1
+UNION
+SELECT pfw.person_id::text
+FROM content.person_film_work pfw
+         JOIN content.film_work fw ON fw.id = pfw.film_work_id
+WHERE fw.modified > $2
+   OR pfw.created > $3
@@ -0,0 +1,5 @@
+SELECT p.id::text AS id
+FROM content.person p
+WHERE p.id > $1::uuid
+ORDER BY p.id
+LIMIT $2
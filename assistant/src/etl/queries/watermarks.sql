@@ -0,0 +1,5 @@
+SELECT (SELECT MAX(modified) FROM content.film_work)       AS film_work,
+       (SELECT MAX(modified) FROM content.person)          AS person,
+       (SELECT MAX(modified) FROM content.genre)           AS genre,
+       (SELECT MAX(created) FROM content.person_film_work) AS person_film_work,
+       (SELECT MAX(created) FROM content.genre_film_work)  AS genre_film_work
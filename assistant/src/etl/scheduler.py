@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+
+from etl.entities import build_entity_dictionary
+from etl.es_loader import load_data_to_elasticsearch
+from etl.listings import build_film_listings
+from etl.state import State
+from services.cache import RELEASE_LOCK_SCRIPT, RedisCacheRepository
+from services.entities import EntityDictionary
+from services.listings import FilmListings
+
+ETL_LOCK_KEY = "etl:lock"
+
+EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ETLScheduler:
+    """
+    Периодически запускает ETL из PostgreSQL в Elasticsearch.
+
+    Перед запуском берётся блокировка в Redis, поэтому при нескольких экземплярах
+    загрузчика работает только один. Пока ETL выполняется, аренда блокировки
+    продлевается. Итоги каждого запуска сохраняются в статус состояния ETL.
+    Если передан cache, из него удаляются загруженные документы и результаты
+    поиска, в которые они вошли. Если переданы listings и entities, после
+    загрузки изменений, при первом запуске и после удаления списков API
+    перестраиваются списки популярных фильмов и словарь сущностей ассистента.
+    """
+
+    def __init__(
+            self,
+            es_conn: AsyncElasticsearch,
+            redis: Redis,
+            state: State,
+            cache: Optional[RedisCacheRepository] = None,
+            listings: Optional[FilmListings] = None,
+            entities: Optional[EntityDictionary] = None,
+            interval: float = 60,
+            lock_lease_ms: int = 60_000,
+            on_loaded: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> None:
+        self.es_conn = es_conn
+        self.redis = redis
+        self.state = state
+        self.cache = cache
+        self.listings = listings
+        self.entities = entities
+        self._materialized_stale = True
+        self.interval = interval
+        self.lock_lease_ms = lock_lease_ms
+        self.on_loaded = on_loaded
+
+    async def run_forever(self) -> None:
+        """Запускает ETL каждые interval секунд."""
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, reindex: bool = False) -> Optional[int]:
+        """
+        Выполняет один запуск ETL под блокировкой.
+
+        При reindex все индексы строятся заново в новых версиях.
+
+        Возвращает количество загруженных документов или None, если блокировка
+        занята другим экземпляром или запуск завершился ошибкой.
+        """
+        async with self.locked() as acquired:
+            if not acquired:
+                logging.info("ETL уже выполняется другим экземпляром, запуск пропущен.")
+                return None
+
+            start = time.perf_counter()
+            try:
+                await self.state.set_status(running=True, last_started_at=utc_now().isoformat())
+                loaded = await load_data_to_elasticsearch(
+                    self.es_conn, self.state, reindex, cache=self.cache
+                )
+                if loaded and self.on_loaded is not None:
+                    await self.on_loaded()
+                self._materialized_stale = (
+                    self._materialized_stale
+                    or bool(loaded)
+                    or (self.listings is not None and not await self.listings.exists())
+                )
+                if self._materialized_stale:
+                    await self._build_materialized()
+                    self._materialized_stale = False
+            except Exception as e:
+                logging.exception(f"Ошибка ETL: {e}")
+                await self.state.set_status(
+                    running=False, last_failed_at=utc_now().isoformat(), last_error=str(e)
+                )
+                return None
+
+        await self.state.set_status(
+            running=False,
+            last_success_at=utc_now().isoformat(),
+            last_duration_s=round(time.perf_counter() - start, 3),
+            last_loaded=loaded,
+            last_error=None,
+        )
+        return loaded
+
+    @asynccontextmanager
+    async def locked(self) -> AsyncIterator[bool]:
+        """
+        Берёт блокировку ETL и продлевает её аренду, пока выполняется блок.
+
+        Возвращает, удалось ли взять блокировку; если она занята другим
+        экземпляром, блок выполняется без неё и должен сам решить, что делать.
+        """
+        token = uuid.uuid4().hex
+        if not await self.redis.set(ETL_LOCK_KEY, token, px=self.lock_lease_ms, nx=True):
+            yield False
+            return
+
+        keep_lock = asyncio.create_task(self._keep_lock(token))
+        try:
+            yield True
+        finally:
+            keep_lock.cancel()
+            await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, ETL_LOCK_KEY, token)
+
+    async def _build_materialized(self) -> None:
+        """Перестраивает производные от индексов списки фильмов и словарь сущностей."""
+        if self.listings is not None:
+            await build_film_listings(self.es_conn, self.listings)
+        if self.entities is not None:
+            await build_entity_dictionary(self.es_conn, self.entities)
+
+    async def _keep_lock(self, token: str) -> None:
+        """Продлевает аренду блокировки, пока выполняется ETL."""
+        while True:
+            await asyncio.sleep(self.lock_lease_ms / 3000)
+            if not await self.redis.eval(
+                    EXTEND_LOCK_SCRIPT, 1, ETL_LOCK_KEY, token, self.lock_lease_ms
+            ):
+                logging.warning("Блокировка ETL потеряна во время выполнения.")
+                return
+
+
+async def get_etl_status(state: State, max_lag: float) -> dict[str, Any]:
+    """
+    Возвращает статус ETL и отставание индексов от PostgreSQL.
+
+    Отставание считается от последнего успешного запуска; ETL считается здоровым,
+    если оно не превышает max_lag секунд.
+    """
+    status = await state.get_status()
+    last_success_at = status.get("last_success_at")
+    lag = (
+        (utc_now() - datetime.fromisoformat(last_success_at)).total_seconds()
+        if last_success_at
+        else None
+    )
+    return {
+        **status,
+        "lag_seconds": round(lag, 3) if lag is not None else None,
+        "healthy": lag is not None and lag <= max_lag,
+        "watermarks": {
+            name: value.isoformat() for name, value in (await state.get_watermarks()).items()
+        },
+    }
@@ -0,0 +1,107 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Optional
+
+import aiofiles
+from redis.asyncio import Redis
+
+ETL_STATE_KEY = "etl:state"
+
+
+class BaseStorage(ABC):
+    """Абстрактное хранилище состояния ETL."""
+
+    @abstractmethod
+    async def save_state(self, state: dict[str, Any]) -> None:
+        """Сохраняет состояние в хранилище."""
+        pass
+
+    @abstractmethod
+    async def retrieve_state(self) -> dict[str, Any]:
+        """Получает состояние из хранилища."""
+        pass
+
+
+class RedisStorage(BaseStorage):
+    """Хранит состояние ETL в хэше Redis."""
+
+    def __init__(self, redis: Redis, key: str = ETL_STATE_KEY) -> None:
+        self.redis = redis
+        self.key = key
+
+    async def save_state(self, state: dict[str, Any]) -> None:
+        if state:
+            await self.redis.hset(
+                self.key, mapping={name: json.dumps(value) for name, value in state.items()}
+            )
+
+    async def retrieve_state(self) -> dict[str, Any]:
+        data = await self.redis.hgetall(self.key)
+        return {
+            (name.decode() if isinstance(name, bytes) else name): json.loads(value)
+            for name, value in data.items()
+        }
+
+
+class JsonFileStorage(BaseStorage):
+    """Хранит состояние ETL в JSON-файле."""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+
+    async def save_state(self, state: dict[str, Any]) -> None:
+        current = await self.retrieve_state()
+        current.update(state)
+        tmp_path = f"{self.file_path}.tmp"
+        async with aiofiles.open(tmp_path, "w") as file:
+            await file.write(json.dumps(current))
+        os.replace(tmp_path, self.file_path)
+
+    async def retrieve_state(self) -> dict[str, Any]:
+        try:
+            async with aiofiles.open(self.file_path, "r") as file:
+                return json.loads(await file.read())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+
+class State:
+    """
+    Состояние инкрементального ETL: отметки последних обработанных изменений.
+
+    Для каждой сущности хранится наибольшее значение modified (или created для
+    таблиц связей), которое уже попало в Elasticsearch.
+    """
+
+    def __init__(self, storage: BaseStorage) -> None:
+        self.storage = storage
+
+    async def get_watermarks(self) -> dict[str, datetime]:
+        """Возвращает сохранённые отметки по сущностям."""
+        state = await self.storage.retrieve_state()
+        return {
+            name: datetime.fromisoformat(value)
+            for name, value in state.get("watermarks", {}).items()
+        }
+
+    async def set_watermarks(self, watermarks: dict[str, Optional[datetime]]) -> None:
+        """Сохраняет отметки по сущностям, пропуская пустые."""
+        current = {
+            name: value.isoformat() for name, value in (await self.get_watermarks()).items()
+        }
+        current.update(
+            {name: value.isoformat() for name, value in watermarks.items() if value is not None}
+        )
+        await self.storage.save_state({"watermarks": current})
+
+    async def get_status(self) -> dict[str, Any]:
+        """Возвращает статус последних запусков ETL."""
+        return (await self.storage.retrieve_state()).get("status", {})
+
+    async def set_status(self, **status: Any) -> None:
+        """Обновляет статус ETL переданными полями."""
+        current = await self.get_status()
+        current.update(status)
+        await self.storage.save_state({"status": current})
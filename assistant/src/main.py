@@ -1,3 +1,5 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -6,7 +8,7 @@ from fastapi.responses import ORJSONResponse
 from api.v1 import assistant, films, genres, healthcheck, persons
 from core.config import settings
 from dependencies.container import CoreContainer, ServiceContainer
-from etl.es_loader import load_data_to_elasticsearch
+from etl.es_loader import get_missing_indices
 
 
 @asynccontextmanager
@@ -23,15 +25,34 @@ async def lifespan(app: FastAPI):
             "api.v1.genres",
             "api.v1.persons",
             "api.v1.assistant",
+            "api.v1.healthcheck",
         ]
     )
 
-    await load_data_to_elasticsearch(core_container.elastic_client())
+    missing_indices = await get_missing_indices(core_container.elastic_client())
+    if missing_indices:
+        logging.warning(
+            f"Индексы {', '.join(missing_indices)} не найдены, запустите загрузчик: python -m etl"
+        )
+    background = [
+        asyncio.create_task(service_container.cache().listen_invalidations()),
+        asyncio.create_task(service_container.query_log().run()),
+        asyncio.create_task(service_container.entity_dictionary().run()),
+        asyncio.create_task(service_container.warm_up().run()),
+        asyncio.create_task(service_container.warm_up().warm_nlp()),
+    ]
     try:
         yield
     finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await service_container.query_log().flush()
+        await service_container.inference_engine().close()
         await core_container.redis_client().close()
         await core_container.elastic_client().close()
+        await service_container.redis_client().close()
+        await service_container.elastic_client().close()
 
 
 app = FastAPI(
@@ -32,6 +32,12 @@ class EntityType(str, Enum):
     FILM = "FILM"
 
 
+class AssistantAnswer(BaseModel):
+    intent: str
+    entity: str
+    response_text: str
+
+
 class AssistantYandexRequest(BaseModel):
     meta: Dict[str, Any]
     session: Dict[str, Any]
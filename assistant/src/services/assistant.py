@@ -1,57 +1,235 @@
+import asyncio
 import logging
-from typing import Any, Union
-
-import spacy
+import threading
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 from core.config import ENTITY_MODEL_PATH, INTENT_MODEL_PATH
-from schemas.assistant_schema import EntityType, IntentFields, IntentHandlers
+from schemas.assistant_schema import (AssistantAnswer, EntityType,
+                                      IntentFields, IntentHandlers)
+from services.cache import UtteranceCache
+from services.entities import EntityDictionary
+from services.film import INDEX as FILM_INDEX
 from services.film import FilmService
+from services.inference import InferenceEngine, InferenceOverloadedError
+from services.person import INDEX as PERSON_INDEX
 from services.person import PersonService
 
+if TYPE_CHECKING:
+    from spacy.tokens import Doc
+
+WARMING_UP_RESPONSE = "Я ещё просыпаюсь, повторите вопрос через несколько секунд."
+ENTITY_INDICES = {EntityType.FILM: FILM_INDEX, EntityType.PERSON: PERSON_INDEX}
+INTENT_ENTITY_TYPES = {"actor_movies": EntityType.PERSON, "director_movies": EntityType.PERSON}
+MAX_RESPONSE_LENGTH = 1024
+
 
 class IntentNERModel:
     """Класс для обработки текста с помощью моделей определения намерений и извлечения сущностей."""
 
-    def __init__(self) -> None:
-        """Загружает предобученные модели для классификации намерений и извлечения сущностей."""
-        self.intent_nlp = spacy.load(INTENT_MODEL_PATH)
-        self.ner_nlp = spacy.load(ENTITY_MODEL_PATH)
+    def __init__(self, combined: bool = True) -> None:
+        """
+        Готовит модели для классификации намерений и извлечения сущностей.
+
+        spaCy и веса моделей загружаются не здесь, а при первом обращении к
+        моделям или явном вызове load, чтобы создание объекта не задерживало
+        запуск приложения.
+        """
+        self.combined = combined
+        self._intent_nlp = None
+        self._ner_nlp = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """
+        Загружает предобученные модели, если они ещё не загружены.
+
+        В режиме combined компонент textcat переносится в конвейер NER, и обе
+        головы работают над одним Doc: текст токенизируется один раз, а конвейер
+        проходится за один вызов. Токенизаторы и lookups у моделей совпадают,
+        поэтому результат не отличается от раздельного запуска.
+        """
+        with self._lock:
+            if self._ner_nlp is not None:
+                return
+
+            import spacy
+
+            intent_nlp = spacy.load(INTENT_MODEL_PATH)
+            ner_nlp = spacy.load(ENTITY_MODEL_PATH)
+            if self.combined:
+                ner_nlp.add_pipe("textcat", source=intent_nlp)
+                intent_nlp = ner_nlp
+            self._intent_nlp = intent_nlp
+            self._ner_nlp = ner_nlp
+
+    @property
+    def loaded(self) -> bool:
+        """Загружены ли модели."""
+        return self._ner_nlp is not None
+
+    @property
+    def intent_nlp(self):
+        """Конвейер классификации намерений; загружается при первом обращении."""
+        self.load()
+        return self._intent_nlp
+
+    @property
+    def ner_nlp(self):
+        """Конвейер извлечения сущностей; загружается при первом обращении."""
+        self.load()
+        return self._ner_nlp
 
     def model_intent(self, text: str) -> str:
         """Определяет намерение пользователя на основе текста."""
-        doc = self.intent_nlp(text)
+        return self.intent_from_doc(self.intent_nlp(text))
+
+    def model_entities(self, text: str) -> dict[str, EntityType]:
+        """Извлекает сущности (персоны, фильмы) из текста пользователя."""
+        return self.entities_from_doc(self.ner_nlp(text))
+
+    def predict_batch(self, texts: list[str]) -> list[tuple[dict[str, float], dict[str, EntityType]]]:
+        """Оценивает намерения и извлекает сущности для пачки текстов за один проход nlp.pipe."""
+        batch_size = max(len(texts), 1)
+        if self.combined:
+            return [
+                (self.intent_scores_from_doc(doc), self.entities_from_doc(doc))
+                for doc in self.ner_nlp.pipe(texts, batch_size=batch_size)
+            ]
+
+        intent_docs = self.intent_nlp.pipe(texts, batch_size=batch_size)
+        ner_docs = self.ner_nlp.pipe(texts, batch_size=batch_size)
+        return [
+            (self.intent_scores_from_doc(intent_doc), self.entities_from_doc(ner_doc))
+            for intent_doc, ner_doc in zip(intent_docs, ner_docs)
+        ]
+
+    @staticmethod
+    def intent_from_doc(doc: "Doc") -> str:
+        """Возвращает намерение с максимальной оценкой из обработанного документа."""
         scores = {k: v for k, v in doc.cats.items()}
         predicted_category = max(scores.items(), key=lambda x: x[1])[0]
         return predicted_category
 
-    def model_entities(self, text: str) -> dict[str, EntityType]:
-        """Извлекает сущности (персоны, фильмы) из текста пользователя."""
-        doc = self.ner_nlp(text)
+    @staticmethod
+    def intent_scores_from_doc(doc: "Doc") -> dict[str, float]:
+        """Возвращает оценки всех намерений из обработанного документа."""
+        return dict(doc.cats)
+
+    @staticmethod
+    def entities_from_doc(doc: "Doc") -> dict[str, EntityType]:
+        """Возвращает найденные в документе сущности."""
         entities = {ent.text: ent.label_ for ent in doc.ents}
         return entities
 
 
 class AssistantService:
-    """Сервис обработки запросов пользователя и формирования ответов."""
+    """
+    Сервис обработки запросов пользователя и формирования ответов.
+
+    Найденная моделью сущность сначала ищется в словаре entity_dictionary,
+    и документ загружается по идентификатору; полнотекстовый поиск
+    в Elasticsearch выполняется, только если словарь сущность не знает.
+
+    В одном запросе обрабатывается до max_entities сущностей и до max_intents
+    намерений: кроме самого вероятного, учитываются намерения с оценкой не
+    ниже intent_threshold. Ответы на все пары «сущность — намерение» ищутся
+    одновременно, и каждый ждёт не дольше response_timeout секунд, чтобы
+    ответ уложился во время, которое Алиса ждёт навык. Неполные ответы
+    в кэш не попадают.
+    """
 
     def __init__(
             self,
             film_service: FilmService,
             person_service: PersonService,
-            intent_ner_model: IntentNERModel,
+            inference_engine: InferenceEngine,
+            utterance_cache: UtteranceCache,
+            entity_dictionary: Optional[EntityDictionary] = None,
+            intent_threshold: float = 0.3,
+            max_entities: int = 3,
+            max_intents: int = 2,
+            response_timeout: float = 2.5,
     ) -> None:
         """Инициализирует сервис с доступом к данным о фильмах и персонажах."""
         self.film_service = film_service
         self.person_service = person_service
-        self.intent_ner_model = intent_ner_model
+        self.inference_engine = inference_engine
+        self.utterance_cache = utterance_cache
+        self.entity_dictionary = entity_dictionary
+        self.intent_threshold = intent_threshold
+        self.max_entities = max_entities
+        self.max_intents = max_intents
+        self.response_timeout = response_timeout
+
+    def select_intents(self, scores: dict[str, float]) -> list[str]:
+        """Возвращает самое вероятное намерение и намерения с оценкой не ниже порога."""
+        ranked = sorted(
+            (intent for intent in scores if intent in IntentHandlers.__members__),
+            key=scores.__getitem__,
+            reverse=True,
+        )
+        return [
+            intent for position, intent in enumerate(ranked[:self.max_intents])
+            if position == 0 or scores[intent] >= self.intent_threshold
+        ]
 
-    async def handle_request(self, entities: dict[str, EntityType], intent: str) -> str:
-        """Обрабатывает запрос, формирует поисковый запрос и получает ответ."""
-        entity_name, entity_type = next(iter(entities.items()))
+    @staticmethod
+    def plan(
+            entities: dict[str, EntityType], intents: list[str], max_entities: int
+    ) -> list[tuple[str, EntityType, str]]:
+        """
+        Составляет пары «сущность — намерение», на которые нужно ответить.
+
+        Сущности берутся в порядке упоминания, а намерение сочетается только
+        с сущностями подходящего типа. Если ни одно намерение к сущности не
+        подходит, она обрабатывается с самым вероятным намерением.
+        """
+        tasks = []
+        for entity_name, entity_type in list(entities.items())[:max_entities]:
+            matching = [
+                intent for intent in intents
+                if INTENT_ENTITY_TYPES.get(intent, EntityType.FILM) == entity_type
+            ]
+            tasks.extend((entity_name, entity_type, intent) for intent in matching or intents[:1])
+        return tasks
+
+    async def handle_request(self, entities: dict[str, EntityType], intents: list[str]) -> tuple[str, bool]:
+        """
+        Одновременно отвечает на все пары «сущность — намерение» и объединяет ответы.
+
+        Возвращает текст ответа и признак того, что ответы получены для всех пар.
+        """
+        tasks = self.plan(entities, intents, self.max_entities)
+        responses = await asyncio.gather(
+            *(self.answer(entity_name, entity_type, intent) for entity_name, entity_type, intent in tasks)
+        )
+        complete = all(response is not None for response in responses)
+        return self.merge(
+            [
+                response if response is not None else f"Не успел найти данные о {entity_name}."
+                for response, (entity_name, _, _) in zip(responses, tasks)
+            ]
+        ), complete
+
+    async def answer(self, entity_name: str, entity_type: EntityType, intent: str) -> Optional[str]:
+        """Формирует ответ для одной сущности и одного намерения или None, если не уложился в response_timeout."""
         es_query = await self.es_query(query=entity_name, entity_type=entity_type)
         logging.info(f"Запрос для Elasticsearch: {es_query}")
-        response = await self.get_response(entity_name, entity_type, es_query, intent)
-        return response
+        try:
+            return await asyncio.wait_for(
+                self.get_response(entity_name, entity_type, es_query, intent), self.response_timeout
+            )
+        except asyncio.TimeoutError:
+            logging.warning(f"Ответ для {entity_name} ({intent}) не получен за {self.response_timeout} с")
+            return None
+
+    @staticmethod
+    def merge(responses: list[str]) -> str:
+        """Объединяет ответы в один текст, укладываясь в ограничение длины ответа Алисы."""
+        text = " ".join(dict.fromkeys(response.strip() for response in responses if response))
+        if len(text) > MAX_RESPONSE_LENGTH:
+            text = text[:MAX_RESPONSE_LENGTH - 1].rstrip() + "…"
+        return text
 
     async def get_response(
             self,
@@ -62,7 +240,9 @@ class AssistantService:
     ) -> str:
         """Формирует ответ на основе результатов поиска и шаблона намерения."""
         service = await self.define_service(entity_type)
-        search = await service.get_by_search(es_query)
+        search = await self.resolve(service, entity_name, entity_type)
+        if not search:
+            search = await service.get_by_search(es_query)
         response_template = IntentHandlers[intent].value
         intent_field = IntentFields[intent].value
 
@@ -90,6 +270,21 @@ class AssistantService:
             response=", ".join(results), entity_name=entity_name
         )
 
+    async def resolve(
+            self,
+            service: Union[FilmService, PersonService],
+            entity_name: str,
+            entity_type: EntityType,
+    ) -> list[Any]:
+        """Находит сущность в словаре и загружает самый популярный подходящий документ."""
+        if self.entity_dictionary is None or entity_type not in ENTITY_INDICES:
+            return []
+        ids = self.entity_dictionary.lookup(ENTITY_INDICES[entity_type], entity_name)
+        if not ids:
+            return []
+        logging.info(f"Сущность {entity_name} найдена в словаре: {ids[0]}")
+        return await service.get_many(ids[:1])
+
     async def define_service(self, entity_type) -> Union[FilmService, PersonService]:
         """Определяет, к какому сервису обращаться (фильмы или персоны)."""
         if entity_type == EntityType.PERSON:
@@ -114,15 +309,35 @@ class AssistantService:
 
     async def process_request(self, text: str) -> str:
         """Анализирует текст запроса, извлекает сущности, определяет намерение и формирует ответ."""
-        entities = self.intent_ner_model.model_entities(text)
-        intent = self.intent_ner_model.model_intent(text)
+        cached_answer = await self.utterance_cache.get(text)
+        if cached_answer:
+            logging.info(
+                f"Ответ из кэша. Сущность: {cached_answer.entity}, Намерение: {cached_answer.intent}"
+            )
+            return cached_answer.response_text
+
+        if not self.inference_engine.ready:
+            logging.info("Модели ещё загружаются, запрос не обработан.")
+            return WARMING_UP_RESPONSE
+
+        try:
+            scores, entities = await self.inference_engine.predict(text)
+        except InferenceOverloadedError as e:
+            logging.warning(f"Запрос отклонён: {e}")
+            return "Сейчас слишком много запросов, повторите вопрос чуть позже."
 
-        if not (entities and intent):
+        intents = self.select_intents(scores)
+        if not (entities and intents):
             return "Извините, я не понимаю, вы можете задать вопрос еще раз."
 
-        log_e = tuple(*entities.items())
-        logging.info(f"1. Сущность: {entities}, Намерение: {intent}")
-        logging.info(
-            f"2. Имя: {log_e[0]}. Относится: {log_e[1]}. Что нужно от {log_e[1]}: {intent}"
+        logging.info(f"Сущности: {entities}, Намерения: {intents}")
+        response_text, complete = await self.handle_request(entities, intents)
+        if not complete:
+            return response_text
+        await self.utterance_cache.set(
+            text,
+            AssistantAnswer(
+                intent=", ".join(intents), entity=", ".join(entities), response_text=response_text
+            ),
         )
-        return await self.handle_request(entities, intent)
+        return response_text
@@ -1,9 +1,42 @@
+import asyncio
+import hashlib
 import json
+import logging
+import math
+import re
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Union
+from collections import Counter, OrderedDict
+from typing import Any, AsyncIterator, Optional, Type, Union
 
+from pydantic import BaseModel, ValidationError
 from redis.asyncio import Redis
 
+from schemas.assistant_schema import AssistantAnswer
+
+from .codecs import CacheFormatError, CacheSerializer
+
+UTTERANCE_CACHE_PREFIX = "assistant:utterance"
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+CachedValue = Union[BaseModel, list[BaseModel], dict[str, Any], list[Any]]
+
+
+def validate(data: Any, model: Optional[Type[BaseModel]]) -> Any:
+    """Превращает данные из кэша в экземпляры модели, если она указана."""
+    if model is None:
+        return data
+    if isinstance(data, list):
+        return [model.model_validate(item) for item in data]
+    return model.model_validate(data)
+
 
 class CacheInterface(ABC):
     """Абстрактный интерфейс для взаимодействия с кэшем."""
@@ -18,21 +51,440 @@ class CacheInterface(ABC):
         """Асинхронно записывает данные в кэш."""
         pass
 
+    @abstractmethod
+    async def invalidate(self, *args, **kwargs):
+        """Асинхронно удаляет записи документов и записи, в которые они вошли."""
+        pass
+
 
 class RedisCacheRepository(CacheInterface):
-    """Реализация интерфейса CacheInterface для работы с Redis."""
+    """
+    Реализация интерфейса CacheInterface для работы с Redis.
 
-    def __init__(self, cache: Redis) -> None:
+    Значения, которые не удаётся прочитать (неизвестный формат, записанный
+    другой версией сервиса, или данные, не подходящие под модель), считаются
+    промахом кэша и удаляются.
+    """
+
+    def __init__(self, cache: Redis, serializer: Optional[CacheSerializer] = None) -> None:
         self.cache = cache
+        self.serializer = serializer or CacheSerializer()
+
+    def _decode(
+            self, name: str, cached_data: bytes, model: Optional[Type[BaseModel]], broken: list[str]
+    ) -> Optional[CachedValue]:
+        """Декодирует значение; нечитаемое значение добавляет в broken и возвращает None."""
+        try:
+            return validate(self.serializer.loads(cached_data), model)
+        except (CacheFormatError, ValidationError) as e:
+            logging.warning(f"Значение кэша {name} не читается и будет удалено: {e}")
+            broken.append(name)
+            return None
 
-    async def get(self, name: str) -> Union[dict[str, Any], None]:
-        """Получает данные из кэша по имени."""
+    async def _drop_broken(self, broken: list[str]) -> None:
+        """Удаляет нечитаемые значения."""
+        if broken:
+            await self.cache.unlink(*broken)
+
+    async def get(
+            self, name: str, model: Optional[Type[BaseModel]] = None
+    ) -> Optional[CachedValue]:
+        """Получает данные из кэша по имени и, если указана модель, валидирует их."""
         cached_data = await self.cache.get(name)
         if not cached_data:
             return None
 
-        return json.loads(cached_data)
+        broken: list[str] = []
+        value = self._decode(name, cached_data, model, broken)
+        await self._drop_broken(broken)
+        return value
+
+    async def get_with_ttl(
+            self, name: str, model: Optional[Type[BaseModel]] = None
+    ) -> tuple[Optional[CachedValue], Optional[float]]:
+        """Получает данные и оставшийся срок их жизни в секундах за один запрос к Redis."""
+        async with self.cache.pipeline(transaction=False) as pipe:
+            pipe.get(name)
+            pipe.pttl(name)
+            cached_data, pttl = await pipe.execute()
+
+        if not cached_data:
+            return None, None
+
+        broken: list[str] = []
+        value = self._decode(name, cached_data, model, broken)
+        if broken:
+            await self._drop_broken(broken)
+            return None, None
+        return value, pttl / 1000 if pttl > 0 else None
+
+    async def set(
+            self, name: str, value: Any, ex: int = None, tags: Optional[list[str]] = None
+    ) -> None:
+        """
+        Сохраняет данные в кэш.
+
+        Если указаны tags — ключи документов, вошедших в значение, — имя записи
+        добавляется в обратный индекс каждого из них, чтобы invalidate по ключу
+        документа удалил и эту запись. Множество обратного индекса живёт не
+        меньше последней добавленной в него записи.
+        """
+        if not tags:
+            await self.cache.set(name, self.serializer.dumps(value), ex)
+            return
+
+        async with self.cache.pipeline(transaction=False) as pipe:
+            pipe.set(name, self.serializer.dumps(value), ex)
+            for tag in tags:
+                pipe.sadd(self._get_tag_key(tag), name)
+                if ex:
+                    pipe.expire(self._get_tag_key(tag), ex)
+            await pipe.execute()
+
+    @staticmethod
+    def _get_tag_key(tag: str) -> str:
+        """Генерирует ключ множества записей, в которые вошёл документ."""
+        return f"{tag}:queries"
+
+    async def invalidate(self, tags: list[str]) -> list[str]:
+        """
+        Удаляет записи документов и все записи, в которые они вошли.
+
+        Удалённые ключи публикуются в канал INVALIDATION_CHANNEL, чтобы другие
+        процессы удалили их из своих кэшей в памяти. Возвращает удалённые ключи.
+        """
+        if not tags:
+            return []
+
+        tag_keys = [self._get_tag_key(tag) for tag in tags]
+        async with self.cache.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+
+        names = set(tags)
+        for tag_members in members:
+            names.update(
+                member.decode() if isinstance(member, bytes) else member
+                for member in tag_members
+            )
+        names = sorted(names)
+        await self.cache.unlink(*names, *tag_keys)
+        await self.cache.publish(INVALIDATION_CHANNEL, json.dumps({"keys": names}))
+        return names
+
+    async def invalidate_prefix(self, prefix: str) -> int:
+        """Удаляет все записи с префиксом и сообщает о нём другим процессам."""
+        deleted = await self.delete_by_pattern(f"{prefix}*")
+        await self.cache.publish(INVALIDATION_CHANNEL, json.dumps({"prefixes": [prefix]}))
+        return deleted
+
+    async def subscribe_invalidations(self) -> AsyncIterator[dict[str, list[str]]]:
+        """Возвращает поток сообщений об удалённых ключах и префиксах."""
+        pubsub = self.cache.pubsub()
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+            await pubsub.close()
+
+    async def get_many_with_ttl(
+            self, names: list[str], model: Optional[Type[BaseModel]] = None
+    ) -> list[tuple[Optional[CachedValue], Optional[float]]]:
+        """Получает несколько значений и их сроки жизни за один запрос к Redis."""
+        async with self.cache.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.get(name)
+                pipe.pttl(name)
+            replies = await pipe.execute()
+
+        results = []
+        broken: list[str] = []
+        for name, cached_data, pttl in zip(names, replies[::2], replies[1::2]):
+            value = self._decode(name, cached_data, model, broken) if cached_data else None
+            if value is None:
+                results.append((None, None))
+                continue
+            results.append((value, pttl / 1000 if pttl > 0 else None))
+        await self._drop_broken(broken)
+        return results
+
+    async def get_many(
+            self, names: list[str], model: Optional[Type[BaseModel]] = None
+    ) -> list[Optional[CachedValue]]:
+        """Получает несколько значений одним запросом MGET."""
+        if not names:
+            return []
+        broken: list[str] = []
+        results = [
+            self._decode(name, cached_data, model, broken) if cached_data else None
+            for name, cached_data in zip(names, await self.cache.mget(names))
+        ]
+        await self._drop_broken(broken)
+        return results
+
+    async def set_many(self, values: dict[str, Any], ex: int = None) -> None:
+        """Сохраняет несколько значений за один запрос к Redis."""
+        if not values:
+            return
+        async with self.cache.pipeline(transaction=False) as pipe:
+            for name, value in values.items():
+                pipe.set(name, self.serializer.dumps(value), ex)
+            await pipe.execute()
+
+    async def acquire_lock(self, name: str, token: str, lease_ms: int) -> bool:
+        """Берёт блокировку с ограниченным сроком аренды, если она свободна."""
+        return bool(await self.cache.set(name, token, px=lease_ms, nx=True))
+
+    async def release_lock(self, name: str, token: str) -> None:
+        """Снимает блокировку, только если она всё ещё принадлежит владельцу токена."""
+        await self.cache.eval(RELEASE_LOCK_SCRIPT, 1, name, token)
+
+    async def is_locked(self, name: str) -> bool:
+        """Проверяет, удерживается ли блокировка."""
+        return bool(await self.cache.exists(name))
+
+    async def delete_by_pattern(self, pattern: str, batch_size: int = 500) -> int:
+        """Удаляет ключи, подходящие под шаблон, и возвращает их количество."""
+        deleted = 0
+        keys = []
+        async for key in self.cache.scan_iter(match=pattern, count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                deleted += await self.cache.unlink(*keys)
+                keys = []
+        if keys:
+            deleted += await self.cache.unlink(*keys)
+        return deleted
+
+
+class LRUCache:
+    """Ограниченный по размеру кэш в памяти процесса с вытеснением LRU и сроком жизни записей."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """Возвращает значение по ключу или None, если его нет или срок жизни истёк."""
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: str) -> tuple[Any, Optional[float]]:
+        """Возвращает значение и оставшийся срок его жизни в секундах."""
+        item = self._data.get(key)
+        if item is None:
+            return None, None
+
+        expires_at, value = item
+        ttl = expires_at - time.monotonic()
+        if ttl <= 0:
+            del self._data[key]
+            return None, None
+
+        self._data.move_to_end(key)
+        return value, ttl if ttl != math.inf else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохраняет значение, вытесняя давно не использованные записи."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else math.inf
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Удаляет значение по ключу."""
+        self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Удаляет значения, ключи которых начинаются с prefix."""
+        for key in [key for key in self._data if key.startswith(prefix)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCacheRepository(CacheInterface):
+    """
+    Двухуровневый кэш: LRU в памяти процесса перед RedisCacheRepository.
+
+    В памяти хранятся уже провалидированные модели, поэтому повторное чтение
+    горячего ключа не требует ни запроса к Redis, ни десериализации. Запись в
+    памяти живёт ровно столько же, сколько ключ в Redis: при записи берётся тот же
+    ex, при подъёме из Redis — оставшийся PTTL ключа.
+    """
+
+    def __init__(self, cache: RedisCacheRepository, local_size: int = 10_000) -> None:
+        self.cache = cache
+        self.local = LRUCache(max_size=local_size)
+        self.stats = Counter()
+
+    async def get(
+            self, name: str, model: Optional[Type[BaseModel]] = None
+    ) -> Optional[CachedValue]:
+        """Получает данные из памяти процесса, а при промахе — из Redis."""
+        return (await self.get_with_ttl(name, model))[0]
+
+    async def get_with_ttl(
+            self, name: str, model: Optional[Type[BaseModel]] = None
+    ) -> tuple[Optional[CachedValue], Optional[float]]:
+        """Получает данные и оставшийся срок их жизни в секундах."""
+        value, ttl = self.local.get_with_ttl(name)
+        if value is not None:
+            self.stats["local_hits"] += 1
+            return value, ttl
+        self.stats["local_misses"] += 1
+
+        value, ttl = await self.cache.get_with_ttl(name, model)
+        if value is None:
+            self.stats["redis_misses"] += 1
+            return None, None
+        self.stats["redis_hits"] += 1
+
+        if model is not None:
+            self.local.set(name, value, ttl)
+        return value, ttl
+
+    async def set(
+            self, name: str, value: Any, ex: int = None, tags: Optional[list[str]] = None
+    ) -> None:
+        """Сохраняет данные в Redis и, если это модели, в память процесса."""
+        if isinstance(value, (BaseModel, list)):
+            self.local.set(name, value, ex)
+        await self.cache.set(name, value, ex, tags=tags)
+
+    async def get_many(
+            self, names: list[str], model: Optional[Type[BaseModel]] = None
+    ) -> list[Optional[CachedValue]]:
+        """Получает несколько значений, запрашивая из Redis только отсутствующие в памяти."""
+        values = [self.local.get(name) for name in names]
+        missing = [i for i, value in enumerate(values) if value is None]
+        self.stats["local_hits"] += len(names) - len(missing)
+        self.stats["local_misses"] += len(missing)
+        if not missing:
+            return values
+
+        fetched = await self.cache.get_many_with_ttl([names[i] for i in missing], model)
+        for i, (value, ttl) in zip(missing, fetched):
+            if value is None:
+                self.stats["redis_misses"] += 1
+                continue
+            self.stats["redis_hits"] += 1
+            values[i] = value
+            if model is not None:
+                self.local.set(names[i], value, ttl)
+        return values
+
+    async def set_many(self, values: dict[str, Any], ex: int = None) -> None:
+        """Сохраняет несколько значений в Redis и в память процесса."""
+        for name, value in values.items():
+            if isinstance(value, (BaseModel, list)):
+                self.local.set(name, value, ex)
+        await self.cache.set_many(values, ex)
+
+    async def invalidate(self, tags: list[str]) -> list[str]:
+        """Удаляет записи документов и записи, в которые они вошли, на обоих уровнях."""
+        names = await self.cache.invalidate(tags)
+        self._drop_local({"keys": names})
+        return names
+
+    def _drop_local(self, message: dict[str, list[str]]) -> None:
+        """Удаляет из памяти процесса ключи и префиксы из сообщения об инвалидации."""
+        for name in message.get("keys", []):
+            self.local.delete(name)
+        for prefix in message.get("prefixes", []):
+            self.local.delete_prefix(prefix)
+        self.stats["invalidated"] += 1
+
+    async def listen_invalidations(self, reconnect_delay: float = 1) -> None:
+        """
+        Удаляет из памяти процесса ключи, инвалидированные другими процессами.
+
+        Работает, пока не будет отменена; после обрыва соединения с Redis память
+        процесса очищается целиком, так как сообщения за это время потеряны.
+        """
+        while True:
+            try:
+                async for message in self.cache.subscribe_invalidations():
+                    self._drop_local(message)
+            except Exception as e:
+                logging.warning(f"Подписка на инвалидацию кэша прервана: {e}")
+                self.local.clear()
+            await asyncio.sleep(reconnect_delay)
+
+    def get_stats(self) -> dict[str, int]:
+        """Возвращает счётчики попаданий и промахов по уровням кэша."""
+        return {
+            "local_size": len(self.local),
+            "local_hits": self.stats["local_hits"],
+            "local_misses": self.stats["local_misses"],
+            "redis_hits": self.stats["redis_hits"],
+            "redis_misses": self.stats["redis_misses"],
+            "invalidated": self.stats["invalidated"],
+        }
+
+
+class UtteranceCache:
+    """
+    Кэш готовых ответов ассистента по нормализованному тексту запроса.
+
+    Перед Redis стоит LRU-кэш в памяти процесса с коротким сроком жизни, поэтому
+    после инвалидации в другом процессе устаревший ответ живёт не дольше local_ttl.
+    """
+
+    def __init__(
+            self,
+            cache: RedisCacheRepository,
+            ttl: int = 3600,
+            local_ttl: int = 60,
+            local_size: int = 10_000,
+    ) -> None:
+        self.cache = cache
+        self.ttl = ttl
+        self.local = LRUCache(max_size=local_size, ttl=local_ttl)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Приводит текст к нижнему регистру, убирает пунктуацию и лишние пробелы."""
+        return " ".join(re.sub(r"[^\w\s]|_", " ", text.lower()).split())
+
+    def _get_cache_key(self, text: str) -> str:
+        """Генерирует ключ для кэша на основе нормализованного текста."""
+        text_hash = hashlib.md5(self.normalize(text).encode()).hexdigest()
+        return f"{UTTERANCE_CACHE_PREFIX}:{text_hash}"
+
+    async def get(self, text: str) -> Optional[AssistantAnswer]:
+        """Возвращает сохранённый ответ на запрос."""
+        cache_key = self._get_cache_key(text)
+        answer = self.local.get(cache_key)
+        if answer is not None:
+            return answer
+
+        answer = await self.cache.get(name=cache_key, model=AssistantAnswer)
+        if not answer:
+            return None
+
+        self.local.set(cache_key, answer)
+        return answer
+
+    async def set(self, text: str, answer: AssistantAnswer) -> None:
+        """Сохраняет ответ на запрос."""
+        cache_key = self._get_cache_key(text)
+        self.local.set(cache_key, answer)
+        await self.cache.set(name=cache_key, value=answer, ex=self.ttl)
 
-    async def set(self, name: str, value: Any, ex: int = None) -> None:
-        """Сохраняет данные в кэш."""
-        await self.cache.set(name, value, ex)
+    async def invalidate(self) -> int:
+        """Удаляет все сохранённые ответы, например после перезагрузки индексов."""
+        self.local.clear()
+        return await self.cache.delete_by_pattern(f"{UTTERANCE_CACHE_PREFIX}:*")
@@ -0,0 +1,242 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+import orjson
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC = b"\xc1"
+FORMAT_VERSION = 1
+HEADER_SIZE = 4
+
+
+class CacheFormatError(ValueError):
+    """Значение кэша записано в неизвестном или неподдерживаемом формате."""
+
+
+class Codec(ABC):
+    """Абстрактный кодек для преобразования данных кэша в байты и обратно."""
+
+    codec_id: int
+    name: str
+
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        """Кодирует данные в байты."""
+        pass
+
+    @abstractmethod
+    def decode(self, payload: bytes) -> Any:
+        """Декодирует данные из байтов."""
+        pass
+
+
+class JsonCodec(Codec):
+    """Кодек на стандартном модуле json."""
+
+    codec_id = 0
+    name = "json"
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data).encode()
+
+    def decode(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class OrjsonCodec(Codec):
+    """Кодек на orjson."""
+
+    codec_id = 1
+    name = "orjson"
+
+    def encode(self, data: Any) -> bytes:
+        return orjson.dumps(data)
+
+    def decode(self, payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(Codec):
+    """Кодек на msgpack."""
+
+    codec_id = 2
+    name = "msgpack"
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise RuntimeError("Для кодека msgpack требуется пакет msgpack.")
+
+    def encode(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False)
+
+
+class Compressor(ABC):
+    """Абстрактный алгоритм сжатия закодированных данных."""
+
+    compression_id: int
+    name: str
+
+    @abstractmethod
+    def compress(self, payload: bytes) -> bytes:
+        """Сжимает данные."""
+        pass
+
+    @abstractmethod
+    def decompress(self, payload: bytes) -> bytes:
+        """Распаковывает данные."""
+        pass
+
+
+class ZstdCompressor(Compressor):
+    """Сжатие zstd."""
+
+    compression_id = 1
+    name = "zstd"
+
+    def __init__(self, level: int = 3) -> None:
+        if zstandard is None:
+            raise RuntimeError("Для сжатия zstd требуется пакет zstandard.")
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, payload: bytes) -> bytes:
+        return self._compressor.compress(payload)
+
+    def decompress(self, payload: bytes) -> bytes:
+        return self._decompressor.decompress(payload)
+
+
+class Lz4Compressor(Compressor):
+    """Сжатие lz4."""
+
+    compression_id = 2
+    name = "lz4"
+
+    def __init__(self) -> None:
+        if lz4_frame is None:
+            raise RuntimeError("Для сжатия lz4 требуется пакет lz4.")
+
+    def compress(self, payload: bytes) -> bytes:
+        return lz4_frame.compress(payload)
+
+    def decompress(self, payload: bytes) -> bytes:
+        return lz4_frame.decompress(payload)
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec, OrjsonCodec, MsgpackCodec)}
+COMPRESSORS = {compressor.name: compressor for compressor in (ZstdCompressor, Lz4Compressor)}
+
+
+class CacheSerializer:
+    """
+    Сериализатор значений кэша с версионированным заголовком.
+
+    Каждое значение начинается с заголовка: байт MAGIC, версия формата,
+    идентификатор кодека и идентификатор сжатия. Чтение определяет кодек и сжатие
+    по заголовку, поэтому смена настроек не ломает уже записанные значения,
+    а значения без заголовка читаются как обычный JSON. Сжатие применяется только
+    к данным не короче compression_threshold байт.
+    """
+
+    def __init__(
+            self,
+            codec: str = "orjson",
+            compression: Optional[str] = None,
+            compression_threshold: int = 2048,
+    ) -> None:
+        self.codec = CODECS[codec]()
+        self.compressor = (
+            COMPRESSORS[compression]() if compression and compression != "none" else None
+        )
+        self.compression_threshold = compression_threshold
+        self._codecs: dict[int, Codec] = {self.codec.codec_id: self.codec}
+        self._compressors: dict[int, Compressor] = {}
+        if self.compressor is not None:
+            self._compressors[self.compressor.compression_id] = self.compressor
+
+    @staticmethod
+    def to_primitive(value: Any) -> Any:
+        """Превращает модели и списки моделей в простые типы Python."""
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode="json")
+        if isinstance(value, list):
+            return [
+                item.model_dump(mode="json") if isinstance(item, BaseModel) else item
+                for item in value
+            ]
+        return value
+
+    def dumps(self, value: Any) -> bytes:
+        """Кодирует значение и добавляет заголовок."""
+        payload = self.codec.encode(self.to_primitive(value))
+        compression_id = 0
+        if self.compressor is not None and len(payload) >= self.compression_threshold:
+            payload = self.compressor.compress(payload)
+            compression_id = self.compressor.compression_id
+
+        header = MAGIC + bytes((FORMAT_VERSION, self.codec.codec_id, compression_id))
+        return header + payload
+
+    def loads(self, data: bytes) -> Any:
+        """
+        Декодирует значение по его заголовку.
+
+        Если версия формата, кодек или сжатие неизвестны этому процессу
+        (например, значение записано более новой версией сервиса) или данные
+        повреждены, выбрасывает CacheFormatError.
+        """
+        try:
+            if not data.startswith(MAGIC):
+                return json.loads(data)
+
+            version, codec_id, compression_id = data[1:HEADER_SIZE]
+            if version != FORMAT_VERSION:
+                raise CacheFormatError(f"Неизвестная версия формата кэша: {version}")
+
+            payload = data[HEADER_SIZE:]
+            if compression_id:
+                payload = self._get_compressor(compression_id).decompress(payload)
+            return self._get_codec(codec_id).decode(payload)
+        except CacheFormatError:
+            raise
+        except Exception as e:
+            raise CacheFormatError(f"Не удалось декодировать значение кэша: {e}") from e
+
+    def _get_codec(self, codec_id: int) -> Codec:
+        """Возвращает кодек по идентификатору из заголовка."""
+        if codec_id not in self._codecs:
+            codec = next((c for c in CODECS.values() if c.codec_id == codec_id), None)
+            if codec is None:
+                raise CacheFormatError(f"Неизвестный кодек кэша: {codec_id}")
+            self._codecs[codec_id] = codec()
+        return self._codecs[codec_id]
+
+    def _get_compressor(self, compression_id: int) -> Compressor:
+        """Возвращает алгоритм сжатия по идентификатору из заголовка."""
+        if compression_id not in self._compressors:
+            compressor = next(
+                (c for c in COMPRESSORS.values() if c.compression_id == compression_id), None
+            )
+            if compressor is None:
+                raise CacheFormatError(f"Неизвестное сжатие кэша: {compression_id}")
+            self._compressors[compression_id] = compressor()
+        return self._compressors[compression_id]
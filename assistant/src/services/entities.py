@@ -0,0 +1,202 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import re
+from collections import Counter, defaultdict
+from typing import Optional
+
+import orjson
+from redis.asyncio import Redis
+
+ENTITY_DICTIONARY_KEY = "assistant:entities:v2"
+ENTITY_DICTIONARY_VERSION_KEY = f"{ENTITY_DICTIONARY_KEY}:version"
+
+RUSSIAN_ENDINGS = sorted(
+    [
+        "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ой", "ей", "ом", "ем",
+        "ах", "ях", "ов", "ев", "ую", "юю", "ая", "яя", "ый", "ий", "ые", "ие", "ое", "ее",
+        "ым", "им", "ых", "их", "ам", "ям", "а", "я", "у", "ю", "е", "и", "ы", "ь", "о",
+    ],
+    key=len,
+    reverse=True,
+)
+MIN_STEM_LENGTH = 3
+
+
+def normalize(text: str) -> str:
+    """Приводит текст к нижнему регистру, заменяет ё на е, убирает пунктуацию и лишние пробелы."""
+    return " ".join(re.sub(r"[^\w\s]|_", " ", text.lower().replace("ё", "е")).split())
+
+
+def stem_word(word: str) -> str:
+    """Отрезает у русского слова падежное окончание, оставляя основу не короче MIN_STEM_LENGTH."""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def stem(text: str) -> str:
+    """Нормализует текст и сводит слова к основам, чтобы «Тарантино» и «Квентина Тарантино» совпадали."""
+    return " ".join(stem_word(word) for word in normalize(text).split())
+
+
+def trigrams(text: str) -> set[str]:
+    """Возвращает триграммы текста с границами слов."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Возвращает расстояние Левенштейна или limit + 1, если оно больше limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class EntityIndex:
+    """
+    Словарь названий фильмов и имён персон одного типа сущностей.
+
+    entries — тройки «название или его вариант (например, фамилия персоны),
+    популярность самого популярного документа с этим названием,
+    идентификаторы документов в порядке популярности», ключами словаря
+    становятся основы названий. Поиск идёт по точному совпадению основы,
+    затем по префиксу из целых слов (среди нескольких подходящих названий
+    выбирается самое популярное) и затем по близости: кандидаты
+    отбираются по общим триграммам и проверяются расстоянием Левенштейна
+    не больше 1 + len // distance_step, но не больше max_distance.
+    """
+
+    def __init__(
+            self,
+            entries: list[tuple[str, float, list[str]]],
+            max_distance: int = 2,
+            distance_step: int = 5,
+    ) -> None:
+        self.max_distance = max_distance
+        self.distance_step = distance_step
+        ids: dict[str, dict[str, None]] = defaultdict(dict)
+        scores: dict[str, float] = {}
+        for name, score, doc_ids in entries:
+            key = stem(name)
+            if key:
+                ids[key].update(dict.fromkeys(doc_ids))
+                scores[key] = max(score, scores.get(key, score))
+        self.ids = {key: list(doc_ids) for key, doc_ids in ids.items()}
+        self.scores = scores
+        self.keys = sorted(self.ids)
+        self.trigrams: dict[str, list[int]] = defaultdict(list)
+        for position, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                self.trigrams[trigram].append(position)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, text: str) -> list[str]:
+        """Возвращает идентификаторы документов, подходящих под текст, или пустой список."""
+        key = stem(text)
+        if not key:
+            return []
+        if key in self.ids:
+            return self.ids[key]
+
+        prefix = key + " "
+        position = bisect.bisect_left(self.keys, prefix)
+        matches = itertools.takewhile(
+            lambda candidate: candidate.startswith(prefix), itertools.islice(self.keys, position, None)
+        )
+        best = max(matches, key=self.scores.__getitem__, default=None)
+        if best is not None:
+            return self.ids[best]
+
+        return self._fuzzy(key)
+
+    def _fuzzy(self, key: str) -> list[str]:
+        """
+        Ищет ближайший по расстоянию Левенштейна ключ среди ключей с общими триграммами.
+
+        Из ключей на одинаковом расстоянии выбирается самый популярный.
+        """
+        candidates = Counter()
+        for trigram in trigrams(key):
+            candidates.update(self.trigrams.get(trigram, ()))
+
+        limit = min(self.max_distance, 1 + len(key) // self.distance_step)
+        best, best_distance = None, limit + 1
+        for position, _ in candidates.most_common(20):
+            candidate = self.keys[position]
+            distance = edit_distance(key, candidate, limit)
+            if distance > limit:
+                continue
+            if distance < best_distance or (
+                    distance == best_distance and self.scores[candidate] > self.scores[best]
+            ):
+                best, best_distance = candidate, distance
+        return self.ids[best] if best is not None else []
+
+
+class EntityDictionary:
+    """
+    Словари фильмов и персон для ассистента, загруженные в память процесса.
+
+    Загрузчик ETL сохраняет пары «название — идентификаторы» в Redis и
+    увеличивает версию словаря, а каждый процесс API раз в refresh_interval
+    секунд проверяет версию и при её изменении перестраивает словари в памяти.
+    """
+
+    def __init__(self, redis: Redis, refresh_interval: float = 30) -> None:
+        self.redis = redis
+        self.refresh_interval = refresh_interval
+        self.version: Optional[int] = None
+        self.indices: dict[str, EntityIndex] = {}
+
+    def lookup(self, index_name: str, text: str) -> list[str]:
+        """Возвращает идентификаторы документов индекса, подходящих под текст."""
+        index = self.indices.get(index_name)
+        return index.lookup(text) if index is not None else []
+
+    async def save(self, entries: dict[str, list[tuple[str, float, list[str]]]]) -> int:
+        """Сохраняет записи словарей по индексам и возвращает новую версию."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(ENTITY_DICTIONARY_KEY, orjson.dumps(entries))
+            pipe.incr(ENTITY_DICTIONARY_VERSION_KEY)
+            _, version = await pipe.execute()
+        return version
+
+    async def refresh(self) -> bool:
+        """Перестраивает словари, если в Redis появилась новая версия."""
+        version = await self.redis.get(ENTITY_DICTIONARY_VERSION_KEY)
+        if version is None or int(version) == self.version:
+            return False
+
+        data = await self.redis.get(ENTITY_DICTIONARY_KEY)
+        if data is None:
+            return False
+        entries = orjson.loads(data)
+        self.indices = await asyncio.to_thread(
+            lambda: {index_name: EntityIndex(items) for index_name, items in entries.items()}
+        )
+        self.version = int(version)
+        sizes = {index_name: len(index) for index_name, index in self.indices.items()}
+        logging.info(f"Словарь сущностей версии {self.version} загружен: {sizes}")
+        return True
+
+    async def run(self) -> None:
+        """Периодически обновляет словари, пока не будет отменена."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.warning(f"Не удалось обновить словарь сущностей: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -1,17 +1,43 @@
+import logging
 from typing import Any, Optional
 
 from dependencies.register import RepositoryFactory
 from models.models import Film
+from services.listings import FilmListings
 from services.services import BaseInterface
 
 INDEX = "movies"
 
 
+def build_popular_query(genre: Optional[str], sort: str) -> dict[str, Any]:
+    """
+    Строит запрос фильмов жанра genre или всех жанров, отсортированных по sort.
+
+    Фильмы с одинаковым значением сортировки упорядочиваются по id, поэтому
+    порядок совпадает с материализованными списками FilmListings.
+    """
+    return {
+        "query": {
+            "nested": {
+                "path": "genre",
+                "query": {
+                    "bool": {"must": [{"term": {"genre.id": genre}}] if genre else []}
+                },
+            }
+        },
+        "sort": [
+            {sort.lstrip("-"): {"order": "desc" if sort.startswith("-") else "asc"}},
+            {"id": {"order": "asc"}},
+        ],
+    }
+
+
 class FilmService(BaseInterface):
     """Сервис для выполнения операций с данными фильмов."""
 
-    def __init__(self, repository: RepositoryFactory[Film]):
+    def __init__(self, repository: RepositoryFactory[Film], listings: Optional[FilmListings] = None):
         self.repository = repository.create(Film)
+        self.listings = listings
 
     async def get_by_id(self, film_id: str) -> Film:
         """Получает данные фильма по его идентификатору."""
@@ -20,3 +46,40 @@ class FilmService(BaseInterface):
     async def get_by_search(self, query: Optional[dict[str, Any]]) -> list[Film]:
         """Выполняет поиск фильмов по запросу."""
         return await self.repository.get_by_search(index_name=INDEX, body=query)
+
+    async def get_page(
+            self, query: dict[str, Any], pit_id: Optional[str] = None
+    ) -> tuple[list[Film], Optional[str], Optional[list[Any]]]:
+        """Получает страницу поиска фильмов по курсору."""
+        return await self.repository.get_page(index_name=INDEX, body=query, pit_id=pit_id)
+
+    async def get_popular(
+            self, genre: Optional[str], sort: str, offset: int, limit: int
+    ) -> Optional[list[Film]]:
+        """
+        Получает страницу популярных фильмов из материализованных списков.
+
+        Возвращает None, если страницы в списках нет и её нужно искать запросом
+        build_popular_query. Если части фильмов страницы уже нет в индексе,
+        списки устарели: они удаляются до следующей сборки, и страница тоже
+        ищется запросом.
+        """
+        if self.listings is None:
+            return None
+
+        film_ids = await self.listings.get_ids(sort, genre, offset, limit)
+        if film_ids is None:
+            return None
+        films = await self.get_many(film_ids)
+        if len(films) < len(film_ids):
+            logging.warning(
+                f"В списке популярных фильмов {self.listings.get_key(sort, genre)} "
+                f"не найдено {len(film_ids) - len(films)} фильмов, списки удалены до следующей сборки."
+            )
+            await self.listings.invalidate()
+            return None
+        return films
+
+    async def get_many(self, film_ids: list[str]) -> list[Film]:
+        """Получает данные фильмов по списку идентификаторов."""
+        return await self.repository.get_many(index_name=INDEX, obj_ids=film_ids)
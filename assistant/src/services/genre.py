@@ -5,6 +5,7 @@ from models.models import Genre
 from services.services import BaseInterface
 
 INDEX = "genres"
+GENRE_LIST_QUERY = {"size": 10_000}
 
 
 class GenreService(BaseInterface):
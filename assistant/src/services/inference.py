@@ -0,0 +1,251 @@
+import asyncio
+import gc
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+BatchPredictor = Callable[[list[str]], list[Any]]
+
+_worker_model: Any = None
+
+
+class InferenceOverloadedError(Exception):
+    """Очередь инференса переполнена и не освободилась за отведённое время."""
+
+
+def _init_worker(model_factory: Callable[[], Any]) -> None:
+    """Загружает модель в дочернем процессе, если её не удалось унаследовать через fork."""
+    global _worker_model
+    _worker_model = model_factory()
+
+
+def predict_in_worker(texts: list[str]) -> list[Any]:
+    """Выполняет инференс пакета моделью, загруженной в процессе пула."""
+    return _worker_model.predict_batch(texts)
+
+
+def create_process_executor(
+        model: Any, workers: int, model_factory: Optional[Callable[[], Any]] = None
+) -> ProcessPoolExecutor:
+    """
+    Создаёт пул процессов для инференса.
+
+    При запуске через fork модель загружается один раз в родительском процессе
+    (см. prepare_for_fork) до первой задачи пула, когда создаются процессы,
+    и дочерние процессы получают её страницы памяти в режиме copy-on-write.
+    На платформах без fork модель создаётся в каждом процессе заново через
+    model_factory — сериализуемую фабрику с теми же аргументами, что у model.
+    """
+    global _worker_model
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        _worker_model = model
+        return ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        )
+
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(model_factory or type(model),)
+    )
+
+
+def prepare_for_fork(model: Any) -> Callable[[], None]:
+    """
+    Возвращает подготовку родительского процесса к созданию пула через fork.
+
+    Подготовка загружает модель, а gc.freeze() убирает созданные объекты из
+    обхода сборщика мусора, чтобы он не записывал в их заголовки и не копировал
+    общие с дочерними процессами страницы памяти.
+    """
+    def prepare() -> None:
+        model.load()
+        gc.freeze()
+
+    return prepare
+
+
+class InferenceEngine:
+    """
+    Движок пакетного инференса NLP-моделей вне event loop.
+
+    Запросы от конкурентных обработчиков складываются в очередь, фоновая задача
+    собирает их в микропакеты (не больше max_batch_size, ожидание не дольше
+    max_wait_ms) и выполняет одним вызовом predict_batch в отдельном исполнителе.
+    Одновременно обрабатывается не больше max_concurrency пакетов. Если очередь
+    заполнена дольше queue_timeout_ms, запрос отклоняется с InferenceOverloadedError.
+
+    Перед первым пакетом в отдельном потоке выполняется prepare, например
+    загрузка модели, поэтому start не блокирует event loop, а ready
+    показывает, завершился ли запуск.
+    """
+
+    def __init__(
+            self,
+            predict_batch: BatchPredictor,
+            max_batch_size: int = 32,
+            max_wait_ms: float = 5.0,
+            executor: Optional[Executor] = None,
+            max_concurrency: int = 1,
+            max_queue_size: int = 0,
+            queue_timeout_ms: float = 100.0,
+            prepare: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="nlp-inference"
+        )
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.prepare = prepare
+        self.ready = False
+        self.error: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        """
+        Готовит модель, прогревает исполнитель и запускает фоновую задачу сборки пакетов.
+
+        Если подготовка модели завершилась ошибкой, фоновая задача не
+        запускается, ошибка сохраняется в error и выбрасывается дальше, а
+        следующий вызов start повторяет подготовку.
+        """
+        if self._worker is not None and not self._worker.done():
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            if self.prepare is not None:
+                await loop.run_in_executor(None, self.prepare)
+            await loop.run_in_executor(self.executor, self.predict_batch, [])
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logging.error(f"Не удалось запустить движок инференса: {self.error}")
+            raise
+
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run())
+        self.error = None
+        self.ready = True
+        logging.info(
+            f"Движок инференса запущен: пакет до {self.max_batch_size}, "
+            f"ожидание до {self.max_wait * 1000:.1f} мс, "
+            f"параллельно {self.max_concurrency} пакетов"
+        )
+
+    async def warm_up(self, texts: list[str]) -> None:
+        """
+        Прогоняет тексты через модель в каждом из max_concurrency потоков исполнителя.
+
+        Первые вызовы конвейеров spaCy заметно медленнее последующих, поэтому
+        прогрев выполняется до того, как сервис начнёт принимать запросы.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, self.predict_batch, texts)
+                for _ in range(self.max_concurrency)
+            )
+        )
+
+    async def close(self) -> None:
+        """Останавливает фоновую задачу и отменяет необработанные запросы."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self.ready = False
+
+        for task in list(self._batches):
+            task.cancel()
+
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, text: str) -> asyncio.Future:
+        """Ставит текст в очередь на инференс и возвращает future с результатом."""
+        if self._worker is None or self._worker.done():
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((text, future)), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise InferenceOverloadedError(
+                f"Очередь инференса заполнена ({self._queue.qsize()} запросов)"
+            )
+        return future
+
+    async def predict(self, text: str) -> Any:
+        """Возвращает результат инференса для одного текста."""
+        return await (await self.submit(text))
+
+    async def _run(self) -> None:
+        """Собирает пакеты из очереди и обрабатывает не больше max_concurrency одновременно."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        def release(task: asyncio.Task) -> None:
+            self._batches.discard(task)
+            semaphore.release()
+
+        while True:
+            await semaphore.acquire()
+            batch = await self._collect_batch()
+            task = asyncio.create_task(self._process_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(release)
+
+    async def _collect_batch(self) -> list[tuple[str, asyncio.Future]]:
+        """Собирает микропакет, ожидая новые запросы не дольше max_wait."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _process_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        """Выполняет инференс пакета в исполнителе и раздаёт результаты."""
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+
+        texts = [text for text, _ in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, self.predict_batch, texts)
+        except Exception as e:
+            logging.error(f"Ошибка инференса пакета из {len(texts)} запросов: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
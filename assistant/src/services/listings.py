@@ -0,0 +1,76 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+LISTINGS_PREFIX = "listings:movies"
+LISTINGS_META_KEY = f"{LISTINGS_PREFIX}:meta"
+ALL_GENRES = "all"
+
+
+class FilmListings:
+    """
+    Материализованные ранжированные списки фильмов по жанрам и сортировкам.
+
+    Для каждого жанра и сортировки в списке Redis хранятся идентификаторы
+    первых depth фильмов, а в хэше LISTINGS_META_KEY — сколько всего фильмов
+    подходит под запрос. Списки строит загрузчик после ETL, а API отдаёт первые
+    страницы срезом списка, не обращаясь к Elasticsearch.
+    """
+
+    def __init__(self, redis: Redis, depth: int = 1000) -> None:
+        self.redis = redis
+        self.depth = depth
+
+    @staticmethod
+    def get_key(sort: str, genre: Optional[str] = None) -> str:
+        """Генерирует ключ списка для сортировки и жанра."""
+        return f"{LISTINGS_PREFIX}:{sort}:{genre or ALL_GENRES}"
+
+    async def get_ids(
+            self, sort: str, genre: Optional[str], offset: int, limit: int
+    ) -> Optional[list[str]]:
+        """
+        Возвращает идентификаторы фильмов страницы из материализованного списка.
+
+        Возвращает None, если список не построен или страница выходит за его
+        глубину, и тогда страницу нужно запросить из Elasticsearch.
+        """
+        key = self.get_key(sort, genre)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hget(LISTINGS_META_KEY, key)
+            pipe.lrange(key, offset, offset + limit - 1)
+            total, ids = await pipe.execute()
+
+        if total is None:
+            return None
+        if len(ids) < limit and offset + len(ids) < int(total):
+            return None
+        return [film_id.decode() if isinstance(film_id, bytes) else film_id for film_id in ids]
+
+    async def save(self, listings: dict[str, tuple[list[str], int]]) -> None:
+        """
+        Атомарно заменяет все списки.
+
+        listings — идентификаторы фильмов и их общее количество по ключам
+        get_key. Списки, которых нет в listings, удаляются.
+        """
+        previous = await self.redis.hkeys(LISTINGS_META_KEY)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(LISTINGS_META_KEY, *previous, *listings)
+            for key, (ids, total) in listings.items():
+                if ids:
+                    pipe.rpush(key, *ids[:self.depth])
+                pipe.hset(LISTINGS_META_KEY, key, total)
+            await pipe.execute()
+
+    async def exists(self) -> bool:
+        """Построены ли списки."""
+        return bool(await self.redis.exists(LISTINGS_META_KEY))
+
+    async def invalidate(self) -> None:
+        """
+        Удаляет все списки, чтобы страницы запрашивались из Elasticsearch, пока
+        загрузчик не построит списки заново.
+        """
+        previous = await self.redis.hkeys(LISTINGS_META_KEY)
+        await self.redis.delete(LISTINGS_META_KEY, *previous)
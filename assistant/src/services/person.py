@@ -20,3 +20,13 @@ class PersonService(BaseInterface):
     async def get_by_search(self, query: Optional[dict[str, Any]]) -> list[PersonFilm]:
         """Выполняет поиск персон по запросу."""
         return await self.repository.get_by_search(index_name=INDEX, body=query)
+
+    async def get_page(
+            self, query: dict[str, Any], pit_id: Optional[str] = None
+    ) -> tuple[list[PersonFilm], Optional[str], Optional[list[Any]]]:
+        """Получает страницу поиска персон по курсору."""
+        return await self.repository.get_page(index_name=INDEX, body=query, pit_id=pit_id)
+
+    async def get_many(self, person_ids: list[str]) -> list[PersonFilm]:
+        """Получает данные персон по списку идентификаторов."""
+        return await self.repository.get_many(index_name=INDEX, obj_ids=person_ids)
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+
+QUERY_LOG_PREFIX = "warmup:queries"
+
+
+class QueryLog:
+    """
+    Частота запросов к репозиториям за последний период.
+
+    Запросы считаются в памяти процесса и раз в flush_interval секунд
+    добавляются в отсортированное множество Redis текущего периода, которое
+    живёт два периода. По нему прогрев после развёртывания повторяет самые
+    частые запросы текущего и предыдущего периодов.
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            period: int = 3600,
+            flush_interval: float = 10,
+            max_size: int = 10_000,
+    ) -> None:
+        self.redis = redis
+        self.period = period
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._counts: Counter = Counter()
+
+    def record(
+            self, index_name: str, obj_id: Optional[str] = None, body: Optional[dict[str, Any]] = None
+    ) -> None:
+        """Учитывает запрос объекта по идентификатору или поиска по запросу."""
+        entry = {"index": index_name, "id": obj_id} if obj_id is not None else {"index": index_name, "body": body}
+        member = json.dumps(entry, sort_keys=True)
+        if member in self._counts or len(self._counts) < self.max_size:
+            self._counts[member] += 1
+
+    def _get_key(self, period_number: int) -> str:
+        """Генерирует ключ множества запросов периода."""
+        return f"{QUERY_LOG_PREFIX}:{period_number}"
+
+    def _current_period(self) -> int:
+        return int(time.time() // self.period)
+
+    async def flush(self) -> None:
+        """Переносит накопленные счётчики в Redis."""
+        counts, self._counts = self._counts, Counter()
+        if not counts:
+            return
+
+        key = self._get_key(self._current_period())
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for member, count in counts.items():
+                pipe.zincrby(key, count, member)
+            pipe.expire(key, self.period * 2)
+            await pipe.execute()
+
+    async def run(self) -> None:
+        """Периодически переносит счётчики в Redis, пока не будет отменена."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.warning(f"Не удалось сохранить частоту запросов: {e}")
+
+    async def top(self, limit: int) -> list[dict[str, Any]]:
+        """Возвращает limit самых частых запросов текущего и предыдущего периодов."""
+        period_number = self._current_period()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for number in (period_number, period_number - 1):
+                pipe.zrevrange(self._get_key(number), 0, limit - 1, withscores=True)
+            replies = await pipe.execute()
+
+        scores: Counter = Counter()
+        for reply in replies:
+            for member, score in reply:
+                scores[member] += score
+        return [json.loads(member) for member, _ in scores.most_common(limit)]
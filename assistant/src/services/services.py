@@ -1,11 +1,18 @@
+import asyncio
 import hashlib
 import json
+import logging
+import math
+import random
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Generic, Optional, Type, TypeVar
+from typing import Any, Awaitable, Callable, Generic, Optional, Type, TypeVar
 
 from pydantic import BaseModel
 
 from .cache import CacheInterface
+from .query_log import QueryLog
+from .singleflight import SingleFlight
 from .storage import StorageInterface
 
 FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 3
@@ -29,24 +36,91 @@ class BaseInterface(ABC):
         pass
 
 
+class CacheTTLPolicy:
+    """
+    Политика срока жизни записей кэша репозитория.
+
+    Запись хранится в кэше hard_ttl секунд, но считается свежей только soft_ttl.
+    Устаревшая запись отдаётся сразу, а обновление из хранилища запускается в фоне.
+    При xfetch_beta > 0 обновление может начаться и раньше soft_ttl с вероятностью,
+    растущей по мере приближения к нему и пропорциональной времени загрузки
+    (алгоритм XFetch), чтобы горячие ключи не устаревали одновременно.
+    """
+
+    def __init__(
+            self,
+            soft_ttl: int = FILM_CACHE_EXPIRE_IN_SECONDS,
+            hard_ttl: Optional[int] = None,
+            xfetch_beta: float = 0.0,
+    ) -> None:
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl or soft_ttl, soft_ttl)
+        self.xfetch_beta = xfetch_beta
+        self._load_time: dict[str, float] = {}
+        self._background: set[asyncio.Task] = set()
+
+    @property
+    def stale_while_revalidate(self) -> bool:
+        """Включён ли режим отдачи устаревших записей с фоновым обновлением."""
+        return self.hard_ttl > self.soft_ttl
+
+    def should_refresh(self, index_name: str, ttl: float) -> bool:
+        """Решает по оставшемуся сроку жизни записи, пора ли её обновить."""
+        time_to_stale = ttl - (self.hard_ttl - self.soft_ttl)
+        if time_to_stale <= 0:
+            return True
+
+        delta = self._load_time.get(index_name, 0.0)
+        if self.xfetch_beta <= 0 or delta <= 0:
+            return False
+        return -delta * self.xfetch_beta * math.log(1.0 - random.random()) >= time_to_stale
+
+    def record_load_time(self, index_name: str, seconds: float) -> None:
+        """Запоминает сглаженное время загрузки из хранилища для индекса."""
+        previous = self._load_time.get(index_name, seconds)
+        self._load_time[index_name] = 0.8 * previous + 0.2 * seconds
+
+    def spawn(self, coro: Awaitable[Any]) -> None:
+        """Запускает фоновое обновление, удерживая ссылку на задачу до её завершения."""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
 class BaseRepository(BaseInterface, Generic[ModelType]):
     """Базовая реализация репозитория для работы с данными."""
 
     def __init__(
-            self, cache: CacheInterface, storage: StorageInterface, model: Type[ModelType]
+            self,
+            cache: CacheInterface,
+            storage: StorageInterface,
+            model: Type[ModelType],
+            single_flight: Optional[SingleFlight] = None,
+            cache_policy: Optional[CacheTTLPolicy] = None,
+            query_log: Optional[QueryLog] = None,
     ):
         self.cache = cache
         self.storage = storage
         self._model = model
+        self.single_flight = single_flight
+        self.cache_policy = cache_policy or CacheTTLPolicy()
+        self.query_log = query_log
 
     async def get_by_id(self, index_name: str, obj_id: str) -> Optional[ModelType]:
         """Получает объект по идентификатору из кэша или хранилища."""
+        if self.query_log is not None:
+            self.query_log.record(index_name, obj_id=obj_id)
         cache_key = self._get_cache_key(index_name, obj_id)
-        cached_data = await self.cache.get(name=cache_key)
-
-        if cached_data:
-            return self._model.model_validate(cached_data)
+        return await self._get_or_load(
+            index_name,
+            cache_key,
+            lambda: self._load_by_id(index_name, obj_id, cache_key),
+        )
 
+    async def _load_by_id(
+            self, index_name: str, obj_id: str, cache_key: str
+    ) -> Optional[ModelType]:
+        """Загружает объект из хранилища и сохраняет его в кэш."""
         storage_data = await self.storage.get(index=index_name, id=obj_id)
         if not storage_data:
             return None
@@ -54,8 +128,8 @@ class BaseRepository(BaseInterface, Generic[ModelType]):
         model_instance = self._model(**storage_data)
         await self.cache.set(
             name=cache_key,
-            value=model_instance.model_dump_json(),
-            ex=FILM_CACHE_EXPIRE_IN_SECONDS,
+            value=model_instance,
+            ex=self.cache_policy.hard_ttl,
         )
 
         return model_instance
@@ -64,12 +138,19 @@ class BaseRepository(BaseInterface, Generic[ModelType]):
             self, index_name: str, body: dict[str, Any] = None
     ) -> Optional[list[ModelType]]:
         """Выполняет поиск объектов по запросу в кэше или хранилище."""
+        if self.query_log is not None:
+            self.query_log.record(index_name, body=body)
         cache_key = self._get_cache_key_for_query(index_name, body)
-        cached_data = await self.cache.get(name=cache_key)
-
-        if cached_data:
-            return [self._model.model_validate(data) for data in cached_data]
+        return await self._get_or_load(
+            index_name,
+            cache_key,
+            lambda: self._load_by_search(index_name, body, cache_key),
+        )
 
+    async def _load_by_search(
+            self, index_name: str, body: Optional[dict[str, Any]], cache_key: str
+    ) -> Optional[list[ModelType]]:
+        """Выполняет поиск в хранилище и сохраняет результат в кэш."""
         storage_data = await self.storage.search(index=index_name, body=body)
         if not storage_data:
             return None
@@ -77,12 +158,135 @@ class BaseRepository(BaseInterface, Generic[ModelType]):
         model_instance = [self._model(**doc["_source"]) for doc in storage_data]
         await self.cache.set(
             name=cache_key,
-            value=json.dumps([model.model_dump() for model in model_instance]),
-            ex=FILM_CACHE_EXPIRE_IN_SECONDS,
+            value=model_instance,
+            ex=self.cache_policy.hard_ttl,
+            tags=[self._get_cache_key(index_name, doc["_id"]) for doc in storage_data],
         )
 
         return model_instance
 
+    async def get_page(
+            self, index_name: str, body: dict[str, Any], pit_id: Optional[str] = None
+    ) -> tuple[list[ModelType], Optional[str], Optional[list[Any]]]:
+        """
+        Получает страницу поиска через search_after в point in time, минуя кэш.
+
+        Возвращает объекты страницы, идентификатор point in time и значения
+        сортировки последнего документа, после которого начинается следующая
+        страница. Запрашивается на один документ больше размера страницы:
+        если его нет, страница последняя, point in time закрывается, а вместо
+        идентификатора и значений сортировки возвращается None. Истёкший или
+        некорректный point in time приводит к PointInTimeError.
+        """
+        size = body["size"]
+        storage_data, pit_id = await self.storage.search_after(
+            index=index_name, body={**body, "size": size + 1}, pit_id=pit_id
+        )
+        storage_data = storage_data or []
+        models = [self._model(**doc["_source"]) for doc in storage_data[:size]]
+        if len(storage_data) <= size:
+            if pit_id is not None:
+                await self.storage.close_point_in_time(pit_id)
+            return models, None, None
+        return models, pit_id, storage_data[size - 1]["sort"]
+
+    async def get_many(self, index_name: str, obj_ids: list[str]) -> list[ModelType]:
+        """
+        Получает несколько объектов по идентификаторам в порядке запроса.
+
+        Кэш читается одним MGET, отсутствующие в кэше документы запрашиваются
+        из хранилища одним mget и записываются в кэш одним конвейером.
+        Ненайденные объекты в результат не попадают.
+        """
+        obj_ids = list(dict.fromkeys(obj_ids))
+        cache_keys = [self._get_cache_key(index_name, obj_id) for obj_id in obj_ids]
+        cached_data = await self.cache.get_many(names=cache_keys, model=self._model)
+        found = {
+            obj_id: value for obj_id, value in zip(obj_ids, cached_data) if value
+        }
+
+        missing = [obj_id for obj_id in obj_ids if obj_id not in found]
+        if missing:
+            storage_data = await self.storage.mget(index=index_name, ids=missing)
+            loaded = {
+                obj_id: self._model(**data)
+                for obj_id, data in zip(missing, storage_data)
+                if data
+            }
+            await self.cache.set_many(
+                values={
+                    self._get_cache_key(index_name, obj_id): model_instance
+                    for obj_id, model_instance in loaded.items()
+                },
+                ex=self.cache_policy.hard_ttl,
+            )
+            found.update(loaded)
+
+        return [found[obj_id] for obj_id in obj_ids if obj_id in found]
+
+    async def invalidate(self, index_name: str, obj_ids: list[str]) -> int:
+        """
+        Удаляет из кэша объекты и все сохранённые результаты поиска, в которые они вошли.
+
+        Вызывается после обновления или удаления документов в хранилище.
+        Возвращает количество удалённых записей кэша.
+        """
+        cache_keys = [self._get_cache_key(index_name, obj_id) for obj_id in obj_ids]
+        return len(await self.cache.invalidate(cache_keys))
+
+    async def _get_or_load(
+            self, index_name: str, cache_key: str, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Возвращает значение из кэша, при необходимости загружая или обновляя его."""
+        loader = self._timed(index_name, loader)
+
+        if not self.cache_policy.stale_while_revalidate:
+            cached_data = await self.cache.get(name=cache_key, model=self._model)
+            if cached_data:
+                return cached_data
+            return await self._coalesce(cache_key, loader)
+
+        cached_data, ttl = await self.cache.get_with_ttl(name=cache_key, model=self._model)
+        if not cached_data:
+            return await self._coalesce(cache_key, loader)
+
+        if ttl is not None and self.cache_policy.should_refresh(index_name, ttl):
+            self.cache_policy.spawn(self._refresh(cache_key, loader))
+        return cached_data
+
+    async def _refresh(self, cache_key: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        """Обновляет запись кэша в фоне."""
+        try:
+            await self._coalesce(cache_key, loader)
+        except Exception as e:
+            logging.warning(f"Не удалось обновить кэш {cache_key}: {e}")
+
+    def _timed(
+            self, index_name: str, loader: Callable[[], Awaitable[Any]]
+    ) -> Callable[[], Awaitable[Any]]:
+        """Оборачивает загрузку из хранилища замером её длительности."""
+        async def inner() -> Any:
+            start = time.perf_counter()
+            try:
+                return await loader()
+            finally:
+                self.cache_policy.record_load_time(index_name, time.perf_counter() - start)
+
+        return inner
+
+    async def _coalesce(
+            self, cache_key: str, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Объединяет одновременные промахи по одному ключу в одно обращение к хранилищу."""
+        if self.single_flight is None:
+            return await loader()
+
+        return await self.single_flight.do(
+            cache_key,
+            loader,
+            recheck=lambda: self.cache.get(name=cache_key, model=self._model),
+        )
+
     @staticmethod
     def _get_cache_key_for_query(index_name: str, body: dict[str, Any]) -> str:
         """Генерирует ключ для кэша на основе запроса."""
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from .cache import RedisCacheRepository
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные промахи кэша по одному ключу в один запрос к хранилищу.
+
+    Внутри процесса все конкурентные вызовы с одинаковым ключом ждут одну задачу
+    и получают её результат. В распределённом режиме перед обращением к хранилищу
+    берётся блокировка в Redis с коротким сроком аренды: процессы, которые её не
+    получили, опрашивают кэш, пока владелец блокировки не запишет значение, и идут
+    в хранилище сами, если блокировка снята без результата (например, документ
+    не найден и в кэш ничего не записано) или аренда истекла.
+    """
+
+    def __init__(
+            self,
+            cache: Optional[RedisCacheRepository] = None,
+            distributed: bool = False,
+            lease_ms: int = 2000,
+            poll_ms: int = 50,
+    ) -> None:
+        self.cache = cache
+        self.distributed = distributed and cache is not None
+        self.lease_ms = lease_ms
+        self.poll = poll_ms / 1000
+        self._calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, loader: Loader, recheck: Optional[Loader] = None) -> Any:
+        """Выполняет loader один раз для всех одновременных вызовов с ключом key."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, loader, recheck))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        """Убирает завершённую задачу из списка выполняющихся."""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def _run(self, key: str, loader: Loader, recheck: Optional[Loader]) -> Any:
+        """Выполняет loader, при необходимости под распределённой блокировкой."""
+        if not self.distributed or recheck is None:
+            return await loader()
+
+        lock_name = f"lock:{key}"
+        token = uuid.uuid4().hex
+        if await self.cache.acquire_lock(lock_name, token, self.lease_ms):
+            try:
+                return await loader()
+            finally:
+                await self.cache.release_lock(lock_name, token)
+
+        deadline = asyncio.get_running_loop().time() + self.lease_ms / 1000
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(self.poll)
+            # Блокировка проверяется до кэша: владелец пишет значение раньше, чем снимает её.
+            locked = await self.cache.is_locked(lock_name)
+            value = await recheck()
+            if value is not None:
+                return value
+            if not locked:
+                return await loader()
+
+        logging.warning(f"Блокировка {lock_name} истекла без результата, запрос к хранилищу.")
+        return await loader()
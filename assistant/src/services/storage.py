@@ -1,7 +1,21 @@
+import logging
 from abc import ABC, abstractmethod
-from typing import Any, Union
+from typing import Any, Optional, Union
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
+from elasticsearch import AsyncElasticsearch, NotFoundError, RequestError
+
+
+class PointInTimeError(Exception):
+    """
+    Point in time из курсора нельзя использовать.
+
+    expired — срок жизни point in time истёк; иначе идентификатор или значения
+    сортировки из курсора некорректны.
+    """
+
+    def __init__(self, message: str, expired: bool) -> None:
+        super().__init__(message)
+        self.expired = expired
 
 
 class StorageInterface(ABC):
@@ -19,12 +33,28 @@ class StorageInterface(ABC):
         """Выполняет поиск по заданным аргументам."""
         pass
 
+    @abstractmethod
+    async def mget(self, *args, **kwargs: Any):
+        """Получает несколько документов по заданным аргументам."""
+        pass
+
+    @abstractmethod
+    async def search_after(self, *args, **kwargs: Any):
+        """Выполняет поиск страницы в зафиксированном срезе данных."""
+        pass
+
+    @abstractmethod
+    async def close_point_in_time(self, *args, **kwargs: Any):
+        """Освобождает зафиксированный срез данных."""
+        pass
+
 
 class ElasticStorageRepository(StorageInterface):
     """Реализация интерфейса для работы с хранилищем Elasticsearch."""
 
-    def __init__(self, storage: AsyncElasticsearch) -> None:
+    def __init__(self, storage: AsyncElasticsearch, pit_keep_alive: str = "1m") -> None:
         self.storage = storage
+        self.pit_keep_alive = pit_keep_alive
 
     async def get(self, index: str, id: str) -> Union[dict[str, Any], None]:
         """Получает документ из Elasticsearch по индексу и идентификатору."""
@@ -43,3 +73,60 @@ class ElasticStorageRepository(StorageInterface):
             return None
 
         return docs["hits"]["hits"]
+
+    async def mget(self, index: str, ids: list[str]) -> list[Union[dict[str, Any], None]]:
+        """Получает несколько документов из Elasticsearch одним запросом mget."""
+        if not ids:
+            return []
+        try:
+            docs = await self.storage.mget(index=index, body={"ids": ids})
+        except NotFoundError:
+            return [None] * len(ids)
+
+        return [doc["_source"] if doc.get("found") else None for doc in docs["docs"]]
+
+    async def search_after(
+            self, index: str, body: dict[str, Any], pit_id: Optional[str] = None
+    ) -> tuple[Optional[list[dict[str, Any]]], Optional[str]]:
+        """
+        Выполняет поиск в point in time индекса, открывая его, если pit_id не передан.
+
+        Возвращает найденные документы и идентификатор point in time для
+        следующей страницы или (None, None), если индекса нет. Если переданный
+        pit_id истёк или некорректен, выбрасывает PointInTimeError. Point in time,
+        открытый этим вызовом, при ошибке поиска закрывается.
+        """
+        opened = pit_id is None
+        if opened:
+            try:
+                pit = await self.storage.open_point_in_time(index=index, keep_alive=self.pit_keep_alive)
+            except NotFoundError:
+                return None, None
+            pit_id = pit["id"]
+
+        body = {**body, "pit": {"id": pit_id, "keep_alive": self.pit_keep_alive}}
+        try:
+            docs = await self.storage.search(body=body)
+        except Exception as e:
+            if opened:
+                try:
+                    await self.close_point_in_time(pit_id)
+                except Exception as close_error:
+                    logging.warning(f"Не удалось закрыть point in time после ошибки поиска: {close_error}")
+                if isinstance(e, NotFoundError):
+                    return None, None
+                raise
+            if isinstance(e, NotFoundError):
+                raise PointInTimeError(f"Срок жизни point in time истёк: {e}", expired=True)
+            if isinstance(e, RequestError):
+                raise PointInTimeError(f"Некорректный point in time или search_after: {e}", expired=False)
+            raise
+
+        return docs["hits"]["hits"], docs.get("pit_id", pit_id)
+
+    async def close_point_in_time(self, pit_id: str) -> None:
+        """Закрывает point in time, не дожидаясь истечения его срока жизни."""
+        try:
+            await self.storage.close_point_in_time(body={"id": pit_id})
+        except NotFoundError:
+            pass
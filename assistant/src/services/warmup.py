@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Optional
+
+from services.film import INDEX as FILM_INDEX
+from services.film import FilmService, build_popular_query
+from services.genre import GENRE_LIST_QUERY
+from services.genre import INDEX as GENRE_INDEX
+from services.genre import GenreService
+from services.inference import InferenceEngine
+from services.person import INDEX as PERSON_INDEX
+from services.person import PersonService
+from services.query_log import QueryLog
+
+WARMUP_UTTERANCES = [
+    "кто режиссёр фильма Интерстеллар",
+    "в каких фильмах снимался Леонардо Ди Каприо",
+    "какой рейтинг у фильма Начало",
+]
+FILM_SORTS = ("-imdb_rating", "imdb_rating")
+
+
+class WarmUp:
+    """
+    Прогрев сервиса после развёртывания или очистки Redis.
+
+    run загружает в кэш список жанров, первые страницы фильмов по каждому жанру
+    и повторяет top_k самых частых запросов из QueryLog. Пока он не завершился,
+    сервис не готов принимать трафик; ошибка или превышение timeout секунд
+    прогрев прекращают, и сервис становится готов с тем, что успело попасть
+    в кэш. Сервисам прогрева QueryLog не передаётся, чтобы повторённые запросы
+    не учитывались как пользовательские.
+
+    NLP-модели загружаются и прогреваются отдельно в warm_nlp и готовность
+    сервиса не задерживают: до их загрузки ассистент отвечает, что ещё
+    просыпается.
+    """
+
+    def __init__(
+            self,
+            film_service: FilmService,
+            genre_service: GenreService,
+            person_service: PersonService,
+            inference_engine: InferenceEngine,
+            query_log: Optional[QueryLog] = None,
+            top_k: int = 200,
+            page_size: int = 50,
+            concurrency: int = 8,
+            timeout: float = 60,
+            enabled: bool = True,
+            nlp_retry_delay: float = 30,
+    ) -> None:
+        self.film_service = film_service
+        self.genre_service = genre_service
+        self.person_service = person_service
+        self.inference_engine = inference_engine
+        self.query_log = query_log
+        self.top_k = top_k
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.enabled = enabled
+        self.nlp_retry_delay = nlp_retry_delay
+        self.ready = False
+        self.stats: dict[str, Any] = {}
+
+    async def run(self) -> None:
+        """Выполняет прогрев и отмечает сервис готовым."""
+        if not self.enabled:
+            self.ready = True
+            return
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._run(), self.timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Прогрев не уложился в {self.timeout} с и прерван.")
+        except Exception as e:
+            logging.exception(f"Ошибка прогрева: {e}")
+        finally:
+            self.stats["seconds"] = round(time.perf_counter() - start, 3)
+            self.ready = True
+        logging.info(f"Прогрев завершён: {self.stats}")
+
+    @property
+    def nlp_ready(self) -> bool:
+        """Загружены ли NLP-модели."""
+        return self.inference_engine.ready
+
+    @property
+    def nlp_error(self) -> Optional[str]:
+        """Ошибка последней попытки загрузить NLP-модели."""
+        return self.inference_engine.error
+
+    async def warm_nlp(self) -> None:
+        """
+        Загружает NLP-модели в фоне и прогоняет через них тестовые фразы.
+
+        Если модели загрузить не удалось, попытка повторяется через
+        nlp_retry_delay секунд, пока не будет отменена.
+        """
+        start = time.perf_counter()
+        while True:
+            try:
+                await self.inference_engine.start()
+                break
+            except Exception as e:
+                logging.exception(
+                    f"Ошибка загрузки NLP-моделей, повтор через {self.nlp_retry_delay} с: {e}"
+                )
+                await asyncio.sleep(self.nlp_retry_delay)
+
+        if self.enabled:
+            try:
+                await self.inference_engine.warm_up(WARMUP_UTTERANCES)
+            except Exception as e:
+                logging.exception(f"Ошибка прогрева NLP-моделей: {e}")
+        self.stats["nlp_seconds"] = round(time.perf_counter() - start, 3)
+        logging.info(f"NLP-модели загружены за {self.stats['nlp_seconds']} с")
+
+    async def _run(self) -> None:
+        genres = await self.genre_service.get_by_search(GENRE_LIST_QUERY) or []
+        self.stats["pages"] = await self._gather(
+            self._warm_page(genre, sort)
+            for genre in [None, *(genre.id for genre in genres)]
+            for sort in FILM_SORTS
+        )
+
+        if self.query_log is not None:
+            self.stats["queries"] = await self._gather(
+                self._replay(entry) for entry in await self.query_log.top(self.top_k)
+            )
+
+    async def _gather(self, coros) -> int:
+        """Выполняет прогрев не больше concurrency запросов одновременно и возвращает число успешных."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(coro: Awaitable[Any]) -> Any:
+            async with semaphore:
+                return await coro
+
+        results = await asyncio.gather(*(limited(coro) for coro in coros), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logging.warning(f"Ошибка прогрева запроса: {result}")
+        return sum(not isinstance(result, Exception) for result in results)
+
+    async def _warm_page(self, genre: Optional[str], sort: str) -> None:
+        """Загружает в кэш первую страницу фильмов жанра так же, как это делает API."""
+        films = await self.film_service.get_popular(genre, sort, offset=0, limit=self.page_size)
+        if films is None:
+            await self.film_service.get_by_search(
+                {**build_popular_query(genre, sort), "size": self.page_size, "from": 0}
+            )
+
+    async def _replay(self, entry: dict[str, Any]) -> None:
+        """Повторяет запрос из QueryLog."""
+        service = {
+            FILM_INDEX: self.film_service,
+            GENRE_INDEX: self.genre_service,
+            PERSON_INDEX: self.person_service,
+        }[entry["index"]]
+        if "id" in entry:
+            await service.get_by_id(entry["id"])
+        else:
+            await service.get_by_search(entry["body"])
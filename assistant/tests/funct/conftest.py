@@ -51,14 +51,18 @@ async def es_write_data(es_client):
     Фикстура для записи данных в Elasticsearch.
 
     Создает индекс в Elasticsearch с заданной схемой и записывает предоставленные данные.
-    Выполняет проверку, существует ли индекс, и обновляет его.
+    Выполняет проверку, существует ли индекс, и обновляет его. Если имя занято
+    псевдонимом, который создал загрузчик ETL, удаляются индексы за псевдонимом.
     """
 
     async def inner(es_data: list[dict], index_name: str, schema):
         bulk_query = [
             {"_index": index_name, "_id": row["id"], "_source": row} for row in es_data
         ]
-        if await es_client.indices.exists(index=index_name):
+        if await es_client.indices.exists_alias(name=index_name):
+            aliases = await es_client.indices.get_alias(name=index_name)
+            await es_client.indices.delete(index=",".join(aliases))
+        elif await es_client.indices.exists(index=index_name):
             await es_client.indices.delete(index=index_name)
         await es_client.indices.create(index=index_name, body=schema)
 
@@ -86,3 +90,20 @@ async def make_get_request(client_session):
             }
 
     return inner
+
+
+@pytest_asyncio.fixture(name="make_post_request")
+async def make_post_request(client_session):
+    """
+    Фикстура для выполнения POST-запросов к API с указанным JSON-телом.
+    """
+
+    async def inner(path: str, body):
+        async with client_session.post(path, json=body) as response:
+            return {
+                "status": response.status,
+                "body": await response.json(),
+                "headers": response.headers,
+            }
+
+    return inner
@@ -0,0 +1,68 @@
+from tests.funct.utils.app import import_app_module
+
+assistant = import_app_module("services.assistant")
+schema = import_app_module("schemas.assistant_schema")
+
+EntityType = schema.EntityType
+
+
+def make_service(**kwargs):
+    return assistant.AssistantService(
+        film_service=None, person_service=None, inference_engine=None, utterance_cache=None, **kwargs
+    )
+
+
+class TestAssistantPlan:
+    """
+    Набор тестов разбора запроса ассистента на пары «сущность — намерение».
+    Тесты включают:
+    - Выбор основного и дополнительных намерений по порогу.
+    - Сопоставление намерений с сущностями подходящего типа.
+    - Объединение ответов в один текст.
+    """
+
+    def test_select_intents_threshold(self):
+        """Тест того, что кроме самого вероятного намерения берутся только намерения выше порога."""
+        service = make_service(intent_threshold=0.3, max_intents=2)
+        scores = {"director_info": 0.6, "film_rating": 0.35, "actor_info": 0.05}
+        assert service.select_intents(scores) == ["director_info", "film_rating"]
+        assert service.select_intents({"director_info": 0.2, "film_rating": 0.1}) == ["director_info"]
+
+    def test_select_intents_limit_and_unknown(self):
+        """Тест ограничения числа намерений и пропуска неизвестных категорий."""
+        service = make_service(intent_threshold=0.1, max_intents=1)
+        scores = {"unknown": 0.9, "film_rating": 0.5, "actor_info": 0.4}
+        assert service.select_intents(scores) == ["film_rating"]
+
+    def test_plan_matches_entity_types(self):
+        """Тест того, что намерения о фильмографии достаются персонам, а о фильме — фильмам."""
+        tasks = assistant.AssistantService.plan(
+            {"Нолан": EntityType.PERSON, "Начало": EntityType.FILM},
+            ["actor_info", "director_movies"],
+            3,
+        )
+        assert tasks == [
+            ("Нолан", EntityType.PERSON, "director_movies"),
+            ("Начало", EntityType.FILM, "actor_info"),
+        ]
+
+    def test_plan_fallback_and_limit(self):
+        """Тест основного намерения для сущности без подходящих намерений и ограничения числа сущностей."""
+        tasks = assistant.AssistantService.plan(
+            {"Интерстеллар": EntityType.FILM, "Начало": EntityType.FILM, "Довод": EntityType.FILM},
+            ["actor_movies"],
+            2,
+        )
+        assert tasks == [
+            ("Интерстеллар", EntityType.FILM, "actor_movies"),
+            ("Начало", EntityType.FILM, "actor_movies"),
+        ]
+
+    def test_merge(self):
+        """Тест объединения ответов без повторов и с ограничением длины."""
+        assert assistant.AssistantService.merge(["Ответ один. ", "", "Ответ два.", "Ответ один."]) == (
+            "Ответ один. Ответ два."
+        )
+        merged = assistant.AssistantService.merge(["а" * 800, "б" * 800])
+        assert len(merged) == assistant.MAX_RESPONSE_LENGTH
+        assert merged.endswith("…")
@@ -0,0 +1,69 @@
+import pytest
+
+from tests.funct.utils.app import import_app_module
+
+codecs = import_app_module("services.codecs")
+cache = import_app_module("services.cache")
+
+
+class FakeRedis:
+    """Минимальная замена клиента Redis для чтения и удаления ключей."""
+
+    def __init__(self, data: dict[str, bytes]) -> None:
+        self.data = data
+
+    async def get(self, name):
+        return self.data.get(name)
+
+    async def mget(self, names):
+        return [self.data.get(name) for name in names]
+
+    async def unlink(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+
+class TestCacheSerializer:
+    """
+    Набор тестов версионированного формата значений кэша.
+    Тесты включают:
+    - Чтение значений с заголовком и без него.
+    - Ошибку формата для неизвестных версий, кодеков и сжатия.
+    - Промах кэша вместо ошибки при чтении нечитаемых значений.
+    """
+
+    def test_roundtrip(self):
+        """Тест записи и чтения значения, а также чтения значения без заголовка."""
+        serializer = codecs.CacheSerializer()
+        assert serializer.loads(serializer.dumps({"id": 1})) == {"id": 1}
+        assert serializer.loads(b'{"id": 1}') == {"id": 1}
+
+    @pytest.mark.parametrize(
+        "header",
+        [
+            bytes((codecs.FORMAT_VERSION + 1, 1, 0)),
+            bytes((codecs.FORMAT_VERSION, 99, 0)),
+            bytes((codecs.FORMAT_VERSION, 1, 99)),
+        ],
+    )
+    def test_unknown_format(self, header):
+        """Тест того, что неизвестная версия, кодек или сжатие дают CacheFormatError."""
+        with pytest.raises(codecs.CacheFormatError):
+            codecs.CacheSerializer().loads(codecs.MAGIC + header + b"{}")
+
+    def test_corrupted_payload(self):
+        """Тест того, что повреждённые данные дают CacheFormatError."""
+        with pytest.raises(codecs.CacheFormatError):
+            codecs.CacheSerializer().loads(codecs.MAGIC + bytes((codecs.FORMAT_VERSION, 1, 0)) + b"{")
+
+    @pytest.mark.asyncio
+    async def test_repository_treats_unknown_format_as_miss(self):
+        """Тест того, что репозиторий возвращает промах и удаляет нечитаемое значение."""
+        serializer = codecs.CacheSerializer()
+        unknown = codecs.MAGIC + bytes((codecs.FORMAT_VERSION, 99, 0)) + b"{}"
+        redis = FakeRedis({"good": serializer.dumps({"id": 1}), "bad": unknown, "bad2": unknown})
+        repository = cache.RedisCacheRepository(redis, serializer)
+
+        assert await repository.get("bad") is None
+        assert await repository.get_many(["good", "bad2", "missing"]) == [{"id": 1}, None, None]
+        assert set(redis.data) == {"good"}
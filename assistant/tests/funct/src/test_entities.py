@@ -0,0 +1,64 @@
+from tests.funct.utils.app import import_app_module
+
+entities = import_app_module("services.entities")
+
+PERSONS = [
+    ("Квентин Тарантино", 12, ["tarantino"]),
+    ("Тарантино", 12, ["tarantino"]),
+    ("Квентин Дорантино", 1, ["dorantino"]),
+]
+MOVIES = [
+    ("Звёздные войны: Новая надежда", 8.6, ["new-hope"]),
+    ("Звёздные войны: Империя наносит ответный удар", 8.7, ["empire"]),
+    ("Интерстеллар", 8.7, ["interstellar"]),
+    ("Интерстелла", 3.0, ["interstella"]),
+    ("Криминальное чтиво", 8.9, ["pulp-fiction"]),
+]
+
+
+class TestEntityIndex:
+    """
+    Набор тестов словаря сущностей ассистента.
+    Тесты включают:
+    - Нормализацию и стемминг названий.
+    - Поиск по точному совпадению, префиксу и с опечатками.
+    - Выбор самого популярного названия среди подходящих.
+    """
+
+    def test_stem(self):
+        """Тест того, что падежные формы и регистр сводятся к одной основе."""
+        assert entities.stem("Квентина Тарантино") == entities.stem("квентин тарантино")
+        assert entities.stem("Криминального чтива!") == entities.stem("Криминальное чтиво")
+        assert entities.stem("Ёжик") == entities.stem("ежик")
+        assert entities.stem("Дом") == "дом"
+
+    def test_edit_distance(self):
+        """Тест расстояния Левенштейна и отсечения по пределу."""
+        assert entities.edit_distance("интерстеллар", "интерстелар", 2) == 1
+        assert entities.edit_distance("начало", "аватар", 2) == 3
+
+    def test_lookup_exact_and_inflected(self):
+        """Тест поиска персоны по полному имени, фамилии и их падежным формам."""
+        index = entities.EntityIndex(PERSONS)
+        assert index.lookup("Квентин Тарантино") == ["tarantino"]
+        assert index.lookup("Тарантино") == ["tarantino"]
+        assert index.lookup("Квентина Тарантино") == ["tarantino"]
+        assert index.lookup("") == []
+
+    def test_lookup_prefix_prefers_popular(self):
+        """Тест того, что по префиксу находится самое популярное название, а не первое вставленное."""
+        assert entities.EntityIndex(PERSONS).lookup("Квентина") == ["tarantino"]
+        assert entities.EntityIndex(MOVIES).lookup("Звёздные войны") == ["empire"]
+        assert entities.EntityIndex(list(reversed(MOVIES))).lookup("Звёздные войны") == ["empire"]
+
+    def test_fuzzy(self):
+        """Тест поиска с опечатками: ближайший ключ, при равенстве — самый популярный."""
+        index = entities.EntityIndex(MOVIES)
+        assert index.lookup("Интерстелар") == ["interstellar"]
+        assert index.lookup("криминального чтива") == ["pulp-fiction"]
+        assert index.lookup("Аватар") == []
+
+    def test_fuzzy_tie_prefers_popular(self):
+        """Тест того, что из ключей на одинаковом расстоянии выбирается самый популярный."""
+        index = entities.EntityIndex([("Мост", 1.0, ["low"]), ("Мист", 9.0, ["high"])])
+        assert index._fuzzy("мэст") == ["high"]
@@ -1,3 +1,4 @@
+import base64
 import uuid
 from http import HTTPStatus
 
@@ -19,6 +20,7 @@ class TestFilm:
     - Сортировку фильмов по рейтингу.
     - Поиск фильмов по запросу.
     - Получение конкретного фильма по ID.
+    - Получение нескольких фильмов по списку ID.
     """
 
     @staticmethod
@@ -147,6 +149,74 @@ class TestFilm:
 
             await self.cleaning_es_cache(es_client)
 
+    @pytest.mark.parametrize(("page_size", "expected_pages"), [(25, 3), (20, 3), (30, 2)])
+    async def test_film_popular_cursor(
+        self,
+        es_client,
+        es_film_data,
+        es_write_data,
+        make_get_request,
+        page_size,
+        expected_pages,
+    ):
+        """
+        Тест курсорной пагинации: все фильмы по одному разу в порядке сортировки,
+        а у полной последней страницы нет курсора следующей.
+        """
+        await es_write_data(await es_film_data(), INDEX, SCHEME)
+
+        films, pages, cursor = [], 0, "*"
+        while cursor:
+            response = await make_get_request(
+                FILM_PATH_ROOT, {"sort": "-imdb_rating", "page_size": page_size, "cursor": cursor}
+            )
+            assert response["status"] == HTTPStatus.OK
+            films.extend(response["body"])
+            cursor = response["headers"].get("X-Next-Cursor")
+            pages += 1
+
+        assert pages == expected_pages
+        assert len({film["id"] for film in films}) == len(films) == 60
+        assert films == sorted(films, key=lambda film: film["imdb_rating"], reverse=True)
+        await self.cleaning_es_cache(es_client)
+
+    @pytest.mark.parametrize(
+        ("query_data", "expected_answer"),
+        [
+            (
+                {"page_size": 101},
+                {
+                    "status": HTTPStatus.UNPROCESSABLE_ENTITY,
+                    "detail": {"msg": "Input should be less than or equal to 100"},
+                },
+            ),
+            (
+                {"page_size": 50, "page_number": 201},
+                {
+                    "status": HTTPStatus.BAD_REQUEST,
+                    "detail": "Глубже 10000 результатов листайте с параметром cursor.",
+                },
+            ),
+            (
+                {"cursor": "invalid"},
+                {"status": HTTPStatus.BAD_REQUEST, "detail": "Некорректный курсор."},
+            ),
+            (
+                {"cursor": base64.urlsafe_b64encode(b'{"pit": "forged", "after": [1]}').decode()},
+                {
+                    "status": HTTPStatus.BAD_REQUEST,
+                    "detail": "Курсор недействителен, начните заново с cursor=*.",
+                },
+            ),
+        ],
+    )
+    async def test_film_pagination_limits(
+        self, make_get_request, query_data, expected_answer
+    ):
+        """Тест ограничений пагинации по номеру страницы и курсору."""
+        response = await make_get_request(FILM_PATH_ROOT, query_data)
+        await self._assert_response(response, expected_answer)
+
     @pytest.mark.parametrize(
         ("query_data", "expected_answer"),
         [
@@ -215,3 +285,44 @@ class TestFilm:
             response = await make_get_request(film_id_path, query_data)
             await self._assert_response(response, expected_answer)
             await self.cleaning_es_cache(es_client)
+
+    @pytest.mark.parametrize(
+        ("query_data", "expected_answer"),
+        [
+            ({"ids": ["0", "1", "2"]}, {"status": HTTPStatus.OK, "length": 3}),
+            (
+                {"ids": ["0", str(uuid.uuid4())]},
+                {"status": HTTPStatus.OK, "length": 1},
+            ),
+            (
+                {"ids": [str(uuid.uuid4())]},
+                {"status": HTTPStatus.NOT_FOUND, "detail": "Фильмы не найдены."},
+            ),
+            (
+                {"ids": []},
+                {
+                    "status": HTTPStatus.UNPROCESSABLE_ENTITY,
+                    "detail": {
+                        "msg": "List should have at least 1 item after validation, not 0"
+                    },
+                },
+            ),
+        ],
+    )
+    async def test_get_film_batch_with_cache(
+        self,
+        es_client,
+        es_film_data,
+        make_post_request,
+        es_write_data,
+        query_data,
+        expected_answer,
+    ):
+        """Тест получения нескольких фильмов по списку ID."""
+        film_batch_path = f"{FILM_PATH_ROOT}/batch"
+        await es_write_data(await es_film_data(), INDEX, SCHEME)
+
+        for _ in range(2):
+            response = await make_post_request(film_batch_path, query_data)
+            await self._assert_response(response, expected_answer)
+            await self.cleaning_es_cache(es_client)
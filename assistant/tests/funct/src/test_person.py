@@ -18,6 +18,7 @@ class TestPerson:
     - Поиск персонажей по имени.
     - Получение информации о конкретном персонаже по его ID.
     - Получение списка фильмов, связанных с персонажем по его ID.
+    - Получение нескольких персонажей по списку ID.
     """
 
     @staticmethod
@@ -153,3 +154,31 @@ class TestPerson:
             response = await make_get_request(person_id_path, {})
             await self._assert_response(response, expected_answer)
             await self.cleaning_es_cache(es_client)
+
+    @pytest.mark.parametrize(
+        ("query_data", "expected_answer"),
+        [
+            ({"ids": ["0", "1"]}, {"status": HTTPStatus.OK, "length": 2}),
+            (
+                {"ids": [str(uuid.uuid4())]},
+                {"status": HTTPStatus.NOT_FOUND, "detail": "Персонажи не найдены."},
+            ),
+        ],
+    )
+    async def test_get_person_batch_with_cache(
+        self,
+        es_client,
+        es_person_data,
+        es_write_data,
+        make_post_request,
+        query_data,
+        expected_answer,
+    ):
+        """Тест получения нескольких персонажей по списку ID с кэшированием."""
+        person_batch_path = f"{PERSON_PATH_ROOT}/batch"
+        await es_write_data(await es_person_data(), INDEX, SCHEME)
+
+        for _ in range(2):
+            response = await make_post_request(person_batch_path, query_data)
+            await self._assert_response(response, expected_answer)
+            await self.cleaning_es_cache(es_client)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from tests.funct.utils.app import import_app_module
+
+singleflight = import_app_module("services.singleflight")
+
+
+class FakeLockCache:
+    """Блокировки в памяти вместо Redis; одну блокировку держит другой процесс."""
+
+    def __init__(self) -> None:
+        self.locks: dict[str, str] = {}
+
+    async def acquire_lock(self, name, token, lease_ms):
+        return self.locks.setdefault(name, token) == token
+
+    async def release_lock(self, name, token):
+        if self.locks.get(name) == token:
+            del self.locks[name]
+
+    async def is_locked(self, name):
+        return name in self.locks
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """
+    Набор тестов объединения промахов кэша.
+    Тесты включают:
+    - Один вызов loader для конкурентных запросов в процессе.
+    - Завершение ожидания, когда владелец блокировки не записал значение.
+    """
+
+    async def test_coalesces_local_calls(self):
+        """Тест того, что конкурентные вызовы с одним ключом выполняют loader один раз."""
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        flight = singleflight.SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", loader) for _ in range(5)))
+        assert results == ["value"] * 5
+        assert len(calls) == 1
+
+    async def test_stops_polling_when_lock_released_without_value(self):
+        """Тест того, что после снятия блокировки без значения ожидание не тянется до конца аренды."""
+        cache = FakeLockCache()
+        cache.locks["lock:key"] = "other-process"
+        flight = singleflight.SingleFlight(cache=cache, distributed=True, lease_ms=2000, poll_ms=10)
+
+        async def release():
+            await asyncio.sleep(0.05)
+            await cache.release_lock("lock:key", "other-process")
+
+        async def loader():
+            return None
+
+        async def recheck():
+            return None
+
+        start = time.perf_counter()
+        results = await asyncio.gather(flight.do("key", loader, recheck), release())
+        assert results[0] is None
+        assert time.perf_counter() - start < 0.5
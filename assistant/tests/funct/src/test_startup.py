@@ -0,0 +1,52 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from tests.funct.utils.app import APP_DIR, app_available, app_env
+
+IMPORT_TIME_BUDGET_SECONDS = 3.0
+LAZY_MODULES = ["spacy", "thinc"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+@pytest.mark.skipif(not app_available("spacy"), reason="исходный код или зависимости приложения недоступны")
+class TestStartup:
+    """
+    Набор тестов холодного запуска приложения.
+
+    Импорт main выполняется в отдельном процессе, чтобы на результат не влияли
+    модули, уже загруженные тестами.
+    """
+
+    @staticmethod
+    def _import_main() -> dict:
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            cwd=APP_DIR,
+            env=app_env(),
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode and "ValidationError" in result.stderr:
+            pytest.skip("не удалось собрать настройки приложения из окружения")
+        assert result.returncode == 0, result.stderr
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_import_time_budget(self):
+        """Тест того, что импорт приложения укладывается в бюджет холодного запуска."""
+        best = min(self._import_main()["seconds"] for _ in range(3))
+        assert best < IMPORT_TIME_BUDGET_SECONDS
+
+    def test_heavy_modules_are_lazy(self):
+        """Тест того, что spaCy и модели не загружаются при импорте приложения."""
+        modules = self._import_main()["modules"]
+        for name in LAZY_MODULES:
+            assert name not in modules
@@ -0,0 +1,47 @@
+import importlib
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from dotenv import dotenv_values
+
+APP_DIR = Path(__file__).resolve().parents[3] / "src"
+ENV_FILES = [APP_DIR.parents[1] / "deploy" / ".env", APP_DIR.parents[1] / "deploy" / ".env.example"]
+APP_MODULES = ["fastapi", "dependency_injector", "redis", "elasticsearch", "orjson"]
+
+
+def app_env() -> dict[str, str]:
+    """
+    Возвращает окружение для импорта приложения.
+
+    Настройки приложения читаются при импорте, а .env из каталога deploy
+    find_dotenv не находит, поэтому переменные берутся из deploy/.env или
+    deploy/.env.example; уже заданные переменные окружения не переопределяются.
+    """
+    env_file = next((path for path in ENV_FILES if path.exists()), None)
+    values = dotenv_values(env_file) if env_file is not None else {}
+    return {**{key: value for key, value in values.items() if value is not None}, **os.environ}
+
+
+def app_available(*modules: str) -> bool:
+    """Доступны ли исходный код приложения и его зависимости."""
+    return (APP_DIR / "main.py").exists() and all(
+        importlib.util.find_spec(module) is not None for module in [*APP_MODULES, *modules]
+    )
+
+
+def import_app_module(name: str) -> ModuleType:
+    """
+    Импортирует модуль приложения в процесс тестов.
+
+    Пропускает тесты модуля, если приложение или его зависимости недоступны.
+    """
+    if not app_available():
+        pytest.skip("исходный код или зависимости приложения недоступны", allow_module_level=True)
+    os.environ.update(app_env())
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+    return importlib.import_module(name)
@@ -4878,6 +4878,13 @@ CREATE UNIQUE INDEX film_work_genre_idx ON content.genre_film_work USING btree (
 CREATE UNIQUE INDEX film_work_person_role_idx ON content.person_film_work USING btree (film_work_id, person_id, role);
 
 
+--
+-- Name: person_film_work_person_idx; Type: INDEX; Schema: content; Owner: postgres
+--
+
+CREATE INDEX person_film_work_person_idx ON content.person_film_work USING btree (person_id);
+
+
 --
 -- Name: auth_group_name_a6ea08ec_like; Type: INDEX; Schema: public; Owner: postgres
 --